@@ -1,4 +1,5 @@
-from typing import List
+from datetime import datetime, timezone
+from typing import List, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.database import supabase
@@ -7,6 +8,25 @@ from app.models import UserRole
 security = HTTPBearer()
 
 
+def is_role_active(expires_at, now: Optional[datetime] = None) -> bool:
+    """
+    Check a user_roles.expires_at value (None, ISO string or datetime) against now.
+    
+    A role with no expiry is active. Values that cannot be parsed count as expired.
+    Pass now when checking several roles so the clock is read once.
+    """
+    if expires_at is None:
+        return True
+    try:
+        # fromisoformat accepts the trailing Z that Postgres/PostgREST emit (Python 3.11+)
+        exp_dt = datetime.fromisoformat(expires_at) if isinstance(expires_at, str) else expires_at
+        if exp_dt.tzinfo is None:
+            exp_dt = exp_dt.replace(tzinfo=timezone.utc)
+        return exp_dt > (now or datetime.now(timezone.utc))
+    except (TypeError, ValueError, AttributeError):
+        return False
+
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get current user from Supabase JWT token"""
     try:
@@ -34,8 +54,7 @@ def require_role(allowed_roles: List[UserRole], school_id: str = None):
         school_id: Optional school_id for school-scoped roles. If None, checks for platform-level roles.
     """
     async def role_checker(user = Depends(get_current_user)):
-        from datetime import datetime, timezone
-        
+        now = datetime.now(timezone.utc)
         allowed_role_values = [r.value for r in allowed_roles]
         user_id = user.user.id
         
@@ -44,26 +63,8 @@ def require_role(allowed_roles: List[UserRole], school_id: str = None):
         if UserRole.PLATFORM_ADMIN in allowed_roles:
             platform_admin_check = supabase.table("user_roles").select("expires_at").eq("user_id", user_id).eq("role", "platform_admin").is_("school_id", "null").eq("is_active", True).execute()
             
-            if platform_admin_check.data:
-                now = datetime.now(timezone.utc)
-                for role in platform_admin_check.data:
-                    expires_at = role.get("expires_at")
-                    if expires_at is None:
-                        return user  # Active role with no expiration
-                    # Check if not expired
-                    try:
-                        if isinstance(expires_at, str):
-                            if expires_at.endswith('Z'):
-                                expires_at = expires_at[:-1] + '+00:00'
-                            exp_dt = datetime.fromisoformat(expires_at)
-                            if exp_dt.tzinfo is None:
-                                exp_dt = exp_dt.replace(tzinfo=timezone.utc)
-                        else:
-                            exp_dt = expires_at
-                        if exp_dt > now:
-                            return user  # Active non-expired role
-                    except:
-                        pass  # If parsing fails, skip this role
+            if any(is_role_active(role.get("expires_at"), now) for role in platform_admin_check.data or []):
+                return user  # Active role with no expiration or not yet expired
         
         # Check for other allowed roles
         # For school-scoped roles (school_admin, teacher), we need to check if user has the role
@@ -90,26 +91,8 @@ def require_role(allowed_roles: List[UserRole], school_id: str = None):
             roles_result = query.execute()
             
             # Filter out expired roles
-            if roles_result.data:
-                now = datetime.now(timezone.utc)
-                for role in roles_result.data:
-                    expires_at = role.get("expires_at")
-                    if expires_at is None:
-                        return user  # Active role with no expiration
-                    # Check if not expired
-                    try:
-                        if isinstance(expires_at, str):
-                            if expires_at.endswith('Z'):
-                                expires_at = expires_at[:-1] + '+00:00'
-                            exp_dt = datetime.fromisoformat(expires_at)
-                            if exp_dt.tzinfo is None:
-                                exp_dt = exp_dt.replace(tzinfo=timezone.utc)
-                        else:
-                            exp_dt = expires_at
-                        if exp_dt > now:
-                            return user  # Active non-expired role
-                    except:
-                        pass  # If parsing fails, skip this role
+            if any(is_role_active(role.get("expires_at"), now) for role in roles_result.data or []):
+                return user  # Active role with no expiration or not yet expired
         
         # Check platform-level roles (only roles without school_id)
         if allowed_platform_level:
@@ -118,48 +101,12 @@ def require_role(allowed_roles: List[UserRole], school_id: str = None):
             roles_result = query.execute()
             
             # Filter out expired roles
-            if roles_result.data:
-                now = datetime.now(timezone.utc)
-                for role in roles_result.data:
-                    expires_at = role.get("expires_at")
-                    if expires_at is None:
-                        return user  # Active role with no expiration
-                    # Check if not expired
-                    try:
-                        if isinstance(expires_at, str):
-                            if expires_at.endswith('Z'):
-                                expires_at = expires_at[:-1] + '+00:00'
-                            exp_dt = datetime.fromisoformat(expires_at)
-                            if exp_dt.tzinfo is None:
-                                exp_dt = exp_dt.replace(tzinfo=timezone.utc)
-                        else:
-                            exp_dt = expires_at
-                        if exp_dt > now:
-                            return user  # Active non-expired role
-                    except:
-                        pass  # If parsing fails, skip this role
+            if any(is_role_active(role.get("expires_at"), now) for role in roles_result.data or []):
+                return user  # Active role with no expiration or not yet expired
         
         # Filter out expired roles
-        if roles_result.data:
-            now = datetime.now(timezone.utc)
-            for role in roles_result.data:
-                expires_at = role.get("expires_at")
-                if expires_at is None:
-                    return user  # Active role with no expiration
-                # Check if not expired
-                try:
-                    if isinstance(expires_at, str):
-                        if expires_at.endswith('Z'):
-                            expires_at = expires_at[:-1] + '+00:00'
-                        exp_dt = datetime.fromisoformat(expires_at)
-                        if exp_dt.tzinfo is None:
-                            exp_dt = exp_dt.replace(tzinfo=timezone.utc)
-                    else:
-                        exp_dt = expires_at
-                    if exp_dt > now:
-                        return user  # Active non-expired role
-                except:
-                    pass  # If parsing fails, skip this role
+        if any(is_role_active(role.get("expires_at"), now) for role in roles_result.data or []):
+            return user  # Active role with no expiration or not yet expired
         
         
         raise HTTPException(
@@ -1,6 +1,46 @@
-from supabase import create_client, Client
+import asyncio
+import logging
+import httpx
+from supabase import create_client, Client, ClientOptions
 from app.config import settings
 
-supabase: Client = create_client(settings.supabase_project_url, settings.supabase_anon_key)
-supabase_admin: Client = create_client(settings.supabase_project_url, settings.supabase_service_role_key)
+logger = logging.getLogger(__name__)
 
+# One pooled HTTP client shared by both Supabase clients, so connections (and TLS
+# sessions) to the Supabase API are kept alive and reused across requests.
+# supabase-py sends full URLs and auth headers per request, so sharing is safe.
+http_client = httpx.Client(
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=30),
+    http2=True,
+    timeout=120,
+    follow_redirects=True,
+)
+
+supabase: Client = create_client(
+    settings.supabase_project_url,
+    settings.supabase_anon_key,
+    options=ClientOptions(httpx_client=http_client),
+)
+supabase_admin: Client = create_client(
+    settings.supabase_project_url,
+    settings.supabase_service_role_key,
+    options=ClientOptions(httpx_client=http_client),
+)
+
+
+async def run_query(query):
+    """Execute a Supabase query in a worker thread so the event loop is not blocked.
+
+    supabase-py's sync client performs blocking HTTP calls; running them via
+    asyncio.to_thread lets independent queries be awaited concurrently.
+    """
+    return await asyncio.to_thread(query.execute)
+
+
+def warm_up() -> None:
+    """Open a pooled connection to Supabase before the first request needs one"""
+    try:
+        # Both clients share http_client, so one request primes the pool for both
+        supabase_admin.table("schools").select("id").limit(1).execute()
+    except Exception as e:
+        logger.warning(f"Supabase warm-up query failed: {str(e)}")
@@ -6,6 +6,10 @@ from app.routers import (
     content, surveys, games, payments, theming, feature_flags
 )
 from app.config import settings
+from app.database import http_client, warm_up
+from app.services.email import close_email_http_client, start_email_workers, stop_email_workers
+from contextlib import asynccontextmanager, suppress
+import asyncio
 import logging
 import sys
 from datetime import datetime
@@ -26,7 +30,28 @@ logging.getLogger("httpcore").setLevel(logging.WARNING)
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="EigoKit API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background workers"""
+    students.start_game_session_writer()
+    start_email_workers()
+    # Prime the Supabase connection pool in the background; startup does not wait on it
+    warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up))
+    yield
+    # Don't hold up shutdown for a slow warm-up. Cancelling only stops waiting on the
+    # worker thread; closing http_client below fails its request if it is still in flight.
+    warm_up_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await warm_up_task
+    await students.stop_game_session_writer()
+    await stop_email_workers()
+    close_email_http_client()
+    await students.close_assemblyai_client()
+    http_client.close()
+
+
+app = FastAPI(title="EigoKit API", version="1.0.0", lifespan=lifespan)
 
 # CORS configuration
 app.add_middleware(
@@ -35,6 +60,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Content-Range", "ETag"],
 )
 
 # Request logging middleware
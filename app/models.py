@@ -21,6 +21,11 @@ class StudentSignIn(BaseModel):
     icon_sequence: List[int]  # 5 icon IDs in order
 
 
+class TeacherInvite(BaseModel):
+    name: str
+    email: str
+
+
 class SurveyQuestionType(str, Enum):
     EMOJI_SCALE = "emoji_scale"
     MULTIPLE_CHOICE = "multiple_choice"
@@ -0,0 +1,79 @@
+"""
+Shared response helpers for routers.
+"""
+import hashlib
+from typing import Any, Iterator, Optional
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Rows encoded per chunk when streaming large lists
+STREAM_CHUNK_ROWS = 500
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson (C encoder) instead of the stdlib json module.
+    
+    Returning an instance directly from an endpoint also skips FastAPI's
+    jsonable_encoder pass, which is pure overhead for rows that are already
+    plain JSON values (as Supabase results are).
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _iter_json_object(content: dict, chunk_rows: int) -> Iterator[bytes]:
+    """Yield a JSON object piece by piece; list values are encoded chunk_rows items at a time"""
+    yield b"{"
+    for i, (key, value) in enumerate(content.items()):
+        yield (b"," if i else b"") + orjson.dumps(key) + b":"
+        if isinstance(value, list):
+            yield b"["
+            for start in range(0, len(value), chunk_rows):
+                # Strip the brackets orjson puts around each slice
+                rows = orjson.dumps(value[start:start + chunk_rows], option=orjson.OPT_NON_STR_KEYS)[1:-1]
+                yield (b"," if start else b"") + rows
+            yield b"]"
+        else:
+            yield orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    yield b"}"
+
+
+def streaming_json_response(content: dict, chunk_rows: int = STREAM_CHUNK_ROWS) -> StreamingResponse:
+    """
+    Send a JSON object with large list values without building the whole body in memory.
+    
+    The first bytes go out as soon as the small leading keys are encoded, and each
+    list is encoded and sent in chunks of chunk_rows rows.
+    """
+    return StreamingResponse(_iter_json_object(content, chunk_rows), media_type="application/json")
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header (which may list several tags, or *) against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: ignore the W/ prefix on either side
+    tag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+
+def etag_json_response(request: Request, content: Any, max_age: int = 30, headers: Optional[dict] = None) -> Response:
+    """
+    Return content as JSON with a weak ETag and a short private Cache-Control.
+    
+    If the client's If-None-Match already matches, a body-less 304 is returned instead.
+    """
+    response = ORJSONResponse(content, headers=headers)
+    etag = 'W/"' + hashlib.blake2b(response.body, digest_size=8).hexdigest() + '"'
+    cache_headers = {"ETag": etag, "Cache-Control": f"private, max-age={max_age}"}
+    
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+    
+    response.headers.update(cache_headers)
+    return response
@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, Depends, Form, Query
 from app.database import supabase, supabase_admin
 from app.config import settings
 from app.models import StudentRegistration, StudentSignIn
-from app.auth import get_current_user
+from app.auth import get_current_user, is_role_active
 from app.services.icon_password import get_icons_by_ids, generate_school_password_icons
 from typing import Optional
 
@@ -576,34 +576,8 @@ async def signin_platform_admin(email: str, password: str):
         user_roles = supabase.table("user_roles").select("role, school_id, is_active, expires_at").eq("user_id", response.user.id).eq("role", "platform_admin").is_("school_id", "null").eq("is_active", True).execute()
         
         # Filter out expired roles
-        active_platform_admin = False
-        if user_roles.data:
-            now = datetime.now(timezone.utc)
-            for role in user_roles.data:
-                expires_at = role.get("expires_at")
-                if expires_at is None:
-                    active_platform_admin = True
-                    break
-                else:
-                    # Parse expires_at - handle both string and datetime
-                    if isinstance(expires_at, str):
-                        try:
-                            # Try parsing ISO format
-                            if expires_at.endswith('Z'):
-                                expires_at = expires_at[:-1] + '+00:00'
-                            exp_dt = datetime.fromisoformat(expires_at)
-                            if exp_dt.tzinfo is None:
-                                exp_dt = exp_dt.replace(tzinfo=timezone.utc)
-                            if exp_dt > now:
-                                active_platform_admin = True
-                                break
-                        except:
-                            pass
-                    else:
-                        # Already a datetime object
-                        if expires_at > now:
-                            active_platform_admin = True
-                            break
+        now = datetime.now(timezone.utc)
+        active_platform_admin = any(is_role_active(role.get("expires_at"), now) for role in user_roles.data or [])
         
         if not active_platform_admin:
             raise HTTPException(status_code=403, detail="Access denied. Platform admin role required.")
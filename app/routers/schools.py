@@ -1,12 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, Form, Query
-from app.database import supabase, supabase_admin
-from app.models import Payment, ThemeConfig
-from app.auth import get_current_user, require_role
+from fastapi import APIRouter, Depends, HTTPException, Form, Query, Request
+from app.database import run_query, supabase, supabase_admin
+from app.models import Payment, TeacherInvite, ThemeConfig
+from app.auth import get_current_user, is_role_active, require_role
+from app.routers.teachers import MAX_BULK_ITEMS, forget_teacher_school
+from app.routers.theming import forget_theme, get_theme as get_school_theme
 from app.models import UserRole
-from typing import List, Optional
-from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import logging
+import time
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between two resends of the same school admin invitation.
+# Absorbs double-clicked "Resend" buttons (per process; not shared across workers).
+RESEND_COOLDOWN_SECONDS = 5
+_resend_last_sent: dict = {}
+
+
+def _check_resend_cooldown(key: tuple) -> None:
+    """Raise 429 if the same invitation was successfully resent within the cooldown window"""
+    now = time.monotonic()
+    last_sent = _resend_last_sent.get(key)
+    if last_sent is not None and now - last_sent < RESEND_COOLDOWN_SECONDS:
+        raise HTTPException(status_code=429, detail="Please wait before resending")
+    # Drop expired entries so the map stays small
+    for stale_key in [k for k, t in _resend_last_sent.items() if now - t >= RESEND_COOLDOWN_SECONDS]:
+        del _resend_last_sent[stale_key]
+
+
+def _record_resend(key: tuple) -> None:
+    """Start the cooldown window for an invitation whose email is being sent"""
+    _resend_last_sent[key] = time.monotonic()
+
+
+def _clear_resend(key: tuple) -> None:
+    """End the cooldown window early because the resend failed"""
+    _resend_last_sent.pop(key, None)
 
 
 def check_school_access(user_id: str, school_id: str) -> bool:
@@ -15,44 +47,14 @@ def check_school_access(user_id: str, school_id: str) -> bool:
         # Check if user has platform_admin role (can access any school)
         platform_admin_role = supabase_admin.table("user_roles").select("expires_at").eq("user_id", user_id).eq("role", "platform_admin").is_("school_id", "null").eq("is_active", True).maybe_single().execute()
         
-        if platform_admin_role and platform_admin_role.data:
-            expires_at = platform_admin_role.data.get("expires_at")
-            if expires_at is None:
-                return True
-            try:
-                if isinstance(expires_at, str):
-                    if expires_at.endswith('Z'):
-                        expires_at = expires_at[:-1] + '+00:00'
-                    exp_dt = datetime.fromisoformat(expires_at)
-                    if exp_dt.tzinfo is None:
-                        exp_dt = exp_dt.replace(tzinfo=timezone.utc)
-                else:
-                    exp_dt = expires_at
-                if exp_dt > datetime.now(timezone.utc):
-                    return True
-            except:
-                pass
+        if platform_admin_role and platform_admin_role.data and is_role_active(platform_admin_role.data.get("expires_at")):
+            return True
         
         # Check if user has school_admin role for this specific school
         school_admin_role = supabase_admin.table("user_roles").select("expires_at").eq("user_id", user_id).eq("role", "school_admin").eq("school_id", school_id).eq("is_active", True).maybe_single().execute()
         
-        if school_admin_role and school_admin_role.data:
-            expires_at = school_admin_role.data.get("expires_at")
-            if expires_at is None:
-                return True
-            try:
-                if isinstance(expires_at, str):
-                    if expires_at.endswith('Z'):
-                        expires_at = expires_at[:-1] + '+00:00'
-                    exp_dt = datetime.fromisoformat(expires_at)
-                    if exp_dt.tzinfo is None:
-                        exp_dt = exp_dt.replace(tzinfo=timezone.utc)
-                else:
-                    exp_dt = expires_at
-                if exp_dt > datetime.now(timezone.utc):
-                    return True
-            except:
-                pass
+        if school_admin_role and school_admin_role.data and is_role_active(school_admin_role.data.get("expires_at")):
+            return True
     except Exception as e:
         # Log error but don't fail - return False to deny access
         import logging
@@ -65,26 +67,13 @@ def check_school_access(user_id: str, school_id: str) -> bool:
 @router.get("/{school_id}/teachers")
 async def get_school_teachers(school_id: str):
     """Get all teachers for a school"""
-    # Get teacher_schools relationships for this school
-    teacher_schools = supabase_admin.table("teacher_schools").select("*").eq("school_id", school_id).execute()
-    
-    if not teacher_schools.data:
-        return {"teachers": []}
-    
-    # Get all teacher IDs
-    teacher_ids = [ts["teacher_id"] for ts in teacher_schools.data]
-    
-    # Get teacher details
-    teachers_data = supabase_admin.table("teachers").select("*").in_("id", teacher_ids).execute()
-    
-    # Create a map of teacher_id -> teacher data
-    teachers_map = {t["id"]: t for t in teachers_data.data}
+    # Get teacher_schools relationships for this school with each teacher embedded
+    teacher_schools = supabase_admin.table("teacher_schools").select("*, teachers(*)").eq("school_id", school_id).execute()
     
     # Merge teacher_schools data with teacher data
     teachers = []
-    for ts in teacher_schools.data:
-        teacher_id = ts["teacher_id"]
-        teacher = teachers_map.get(teacher_id)
+    for ts in teacher_schools.data or []:
+        teacher = ts.get("teachers")
         
         # Skip if teacher record doesn't exist (data integrity issue)
         if not teacher:
@@ -280,24 +269,15 @@ async def get_school_locations(school_id: str):
     return {"locations": locations.data}
 
 
-@router.post("/{school_id}/teachers")
-async def add_teacher(school_id: str, name: str = Form(...), email: str = Form(...), user = Depends(require_role([UserRole.SCHOOL_ADMIN]))):
-    """Add a teacher to school and send invitation email"""
-    import secrets
-    from datetime import datetime, timedelta
-    from app.services.email import email_service
-    
-    # Verify user has access to this school (school_admin or platform_admin)
-    if not check_school_access(user.user.id, school_id):
-        raise HTTPException(status_code=403, detail="Access denied")
+def _create_teacher_invitation(school_id: str, name: str, email: str) -> tuple:
+    """
+    Create (or reuse) the teacher record for email and a pending teacher_schools invitation.
     
-    # Get school name for email
-    school = supabase_admin.table("schools").select("name").eq("id", school_id).single().execute()
-    school_name = school.data.get("name", "the school") if school.data else "the school"
-    
-    # Get inviter name
-    inviter_data = supabase_admin.table("users").select("email").eq("id", user.user.id).single().execute()
-    inviter_email = inviter_data.data.get("email", "") if inviter_data.data else ""
+    Returns (teacher_id, invitation_token). Raises 400 if the teacher already
+    belongs to the school.
+    """
+    import secrets
+    from datetime import timedelta
     
     # Generate unique invitation token
     invitation_token = secrets.token_urlsafe(32)
@@ -331,32 +311,131 @@ async def add_teacher(school_id: str, name: str = Form(...), email: str = Form(.
         "invitation_status": "pending",
         "invitation_expires_at": invitation_expires_at
     }
-    teacher_school_result = supabase_admin.table("teacher_schools").insert(teacher_school_data).execute()
+    supabase_admin.table("teacher_schools").insert(teacher_school_data).execute()
     
-    # Send invitation email (non-blocking - don't fail if email fails)
-    try:
-        email_sent = email_service.send_teacher_invitation(
-            teacher_email=email,
-            teacher_name=name,
-            school_name=school_name,
-            invitation_token=invitation_token,
-            inviter_name=inviter_email
-        )
-        if not email_sent:
-            # Log warning but don't fail the request
-            print(f"Warning: Failed to send invitation email to {email}, but teacher was created")
-    except Exception as e:
-        # Log error but don't fail the request
-        print(f"Error sending invitation email to {email}: {str(e)}")
+    return teacher_id, invitation_token
+
+
+async def _get_invitation_sender(school_id: str, user_id: str) -> Tuple[str, str]:
+    """Get the school name and inviter email shown in teacher invitation emails"""
+    # Independent lookups, so fetch them concurrently
+    school, inviter_data = await asyncio.gather(
+        run_query(supabase_admin.table("schools").select("name").eq("id", school_id).single()),
+        run_query(supabase_admin.table("users").select("email").eq("id", user_id).single()),
+    )
+    school_name = school.data.get("name", "the school") if school.data else "the school"
+    inviter_email = inviter_data.data.get("email", "") if inviter_data.data else ""
+    return school_name, inviter_email
+
+
+@router.post("/{school_id}/teachers")
+async def add_teacher(school_id: str, name: str = Form(...), email: str = Form(...), user = Depends(require_role([UserRole.SCHOOL_ADMIN]))):
+    """Add a teacher to school and send invitation email"""
+    from app.services.email import email_service, enqueue_email
+    
+    # Verify user has access to this school (school_admin or platform_admin)
+    if not check_school_access(user.user.id, school_id):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # Get school name and inviter for email
+    school_name, inviter_email = await _get_invitation_sender(school_id, user.user.id)
+    
+    teacher_id, invitation_token = _create_teacher_invitation(school_id, name, email)
+    
+    # Send invitation email in the background (don't fail the request if email fails).
+    # The send happens after the response, so only report whether it was queued.
+    invitation_queued = False
+    if email_service.resend:
+        try:
+            await enqueue_email(
+                email_service.send_teacher_invitation,
+                teacher_email=email,
+                teacher_name=name,
+                school_name=school_name,
+                invitation_token=invitation_token,
+                inviter_name=inviter_email
+            )
+            invitation_queued = True
+        except Exception as e:
+            # Log error but don't fail the request
+            logger.error(f"Error queueing invitation email to {email}: {str(e)}")
+    else:
+        logger.info(f"Email service not available. Would send invitation to {email}")
     
     # Get teacher data for response
     teacher_result = supabase_admin.table("teachers").select("*").eq("id", teacher_id).single().execute()
     
     return {
         "teacher_id": teacher_id,
-        "message": "Teacher added and invitation email sent",
-        "teacher": teacher_result.data[0],
-        "invitation_sent": True
+        "message": (
+            "Teacher added; the invitation email will be sent shortly" if invitation_queued
+            else "Teacher added, but the invitation email could not be sent"
+        ),
+        "teacher": teacher_result.data,
+        "invitation_queued": invitation_queued
+    }
+
+
+@router.post("/{school_id}/teachers/bulk")
+async def add_teachers_bulk(school_id: str, invites: List[TeacherInvite], user = Depends(require_role([UserRole.SCHOOL_ADMIN]))):
+    """Add several teachers to a school and send their invitation emails in batches"""
+    from app.services.email import email_service
+    
+    if not invites:
+        raise HTTPException(status_code=400, detail="No teachers provided")
+    if len(invites) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ITEMS} teachers can be invited at once")
+    
+    # Verify user has access to this school (school_admin or platform_admin)
+    if not check_school_access(user.user.id, school_id):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    # School name and inviter are shared by every invitation in the batch
+    school_name, inviter_email = await _get_invitation_sender(school_id, user.user.id)
+    
+    results = []
+    invitations = []
+    seen_emails = set()
+    for invite in invites:
+        email_key = invite.email.strip().lower()
+        if email_key in seen_emails:
+            results.append({"email": invite.email, "teacher_id": None, "invitation_sent": False, "error": "Duplicate email in this request"})
+            continue
+        seen_emails.add(email_key)
+        try:
+            teacher_id, invitation_token = _create_teacher_invitation(school_id, invite.name, invite.email)
+        except HTTPException as e:
+            # One bad entry (e.g. already at this school) should not block the rest
+            results.append({"email": invite.email, "teacher_id": None, "invitation_sent": False, "error": e.detail})
+            continue
+        except Exception as e:
+            # Database errors (e.g. a concurrent insert of the same teacher email) only fail this entry,
+            # so the invitations already created still get their emails
+            logger.error(f"Error inviting teacher {invite.email} to school {school_id}: {str(e)}")
+            results.append({"email": invite.email, "teacher_id": None, "invitation_sent": False, "error": "Failed to create teacher invitation"})
+            continue
+        results.append({"email": invite.email, "teacher_id": teacher_id, "invitation_sent": False})
+        invitations.append({
+            "teacher_email": invite.email,
+            "teacher_name": invite.name,
+            "school_name": school_name,
+            "invitation_token": invitation_token,
+            "inviter_name": inviter_email,
+        })
+    
+    # One Resend request per 100 invitation emails (don't fail the request if email fails)
+    if invitations:
+        # Blocking Resend calls (and retry backoff) run in a worker thread, off the event loop
+        sent = await asyncio.to_thread(email_service.send_teacher_invitations_bulk, invitations)
+        created = [r for r in results if r["teacher_id"]]
+        for result, (_, was_sent, email_error) in zip(created, sent):
+            result["invitation_sent"] = was_sent
+            if email_error:
+                result["email_error"] = email_error
+    
+    return {
+        "message": f"{len(invitations)} teachers added",
+        "teachers": results,
     }
 
 
@@ -379,13 +458,8 @@ async def resend_teacher_invitation(school_id: str, teacher_id: str, user = Depe
     teacher_school = teacher_school_result.data
     teacher = teacher_school.get("teachers", {})
     
-    # Get school name for email
-    school = supabase_admin.table("schools").select("name").eq("id", school_id).single().execute()
-    school_name = school.data.get("name", "the school") if school.data else "the school"
-    
-    # Get inviter name
-    inviter_data = supabase_admin.table("users").select("email").eq("id", user.user.id).single().execute()
-    inviter_email = inviter_data.data.get("email", "") if inviter_data.data else ""
+    # Get school name and inviter for email
+    school_name, inviter_email = await _get_invitation_sender(school_id, user.user.id)
     
     # Generate new invitation token
     invitation_token = secrets.token_urlsafe(32)
@@ -401,7 +475,9 @@ async def resend_teacher_invitation(school_id: str, teacher_id: str, user = Depe
     
     # Send invitation email
     try:
-        email_sent = email_service.send_teacher_invitation(
+        # Blocking Resend call (and retry backoff) runs in a worker thread, off the event loop
+        email_sent = await asyncio.to_thread(
+            email_service.send_teacher_invitation,
             teacher_email=teacher["email"],
             teacher_name=teacher["name"],
             school_name=school_name,
@@ -428,7 +504,7 @@ async def resend_teacher_invitation(school_id: str, teacher_id: str, user = Depe
         }
     except Exception as e:
         error_msg = str(e)
-        print(f"Error resending invitation email to {teacher['email']}: {error_msg}")
+        logger.error(f"Error resending invitation email to {teacher['email']}: {error_msg}")
         return {
             "message": f"Invitation token updated, but email failed to send: {error_msg}",
             "invitation_sent": False,
@@ -496,6 +572,7 @@ async def delete_teacher(school_id: str, teacher_id: str, user = Depends(require
     # Remove teacher from this school (delete teacher_schools relationship)
     # Note: This doesn't delete the teacher record, just removes them from this school
     supabase_admin.table("teacher_schools").delete().eq("teacher_id", teacher_id).eq("school_id", school_id).execute()
+    forget_teacher_school(teacher_id)
     return {"message": "Teacher removed from school"}
 
 
@@ -631,18 +708,9 @@ async def get_payment_status(school_id: str):
 
 
 @router.get("/{school_id}/theme")
-async def get_theme(school_id: str):
-    """Get theme configuration for school"""
-    theme = supabase.table("themes").select("*").eq("school_id", school_id).single().execute()
-    if not theme.data:
-        # Return default theme
-        return {
-            "school_id": school_id,
-            "primary_color": "#3B82F6",
-            "secondary_color": "#10B981",
-            "accent_color": "#F59E0B"
-        }
-    return theme.data
+async def get_theme(request: Request, school_id: str):
+    """Get theme configuration for school (same lookup, cache and ETag as GET /api/theming/{school_id})"""
+    return await get_school_theme(request, school_id)
 
 
 @router.post("/{school_id}/theme")
@@ -666,9 +734,11 @@ async def update_theme(school_id: str, theme: ThemeConfig):
     existing = supabase.table("themes").select("id").eq("school_id", school_id).execute()
     if existing.data:
         supabase.table("themes").update(theme_data).eq("school_id", school_id).execute()
+        forget_theme(school_id)
         return {"message": "Theme updated"}
     else:
         result = supabase.table("themes").insert(theme_data).execute()
+        forget_theme(school_id)
         return {"message": "Theme created", "theme_id": result.data[0]["id"]}
 
 
@@ -1018,7 +1088,7 @@ async def invite_school_admin(
     """Invite a new school admin to the school"""
     import secrets
     from datetime import datetime, timedelta
-    from app.services.email import email_service
+    from app.services.email import email_service, enqueue_email, SCHOOL_ADMIN_INVITATION_HTML, SCHOOL_ADMIN_INVITATION_TEXT
     
     # Verify user's school_id matches
     # Verify user has access to this school (school_admin or platform_admin)
@@ -1043,8 +1113,7 @@ async def invite_school_admin(
             existing_invitation = existing_invitation_result.data[0]
             # Check if invitation is still valid (not expired)
             if existing_invitation.get("invitation_expires_at"):
-                expires_at = datetime.fromisoformat(existing_invitation["invitation_expires_at"].replace("Z", "+00:00"))
-                if datetime.utcnow().replace(tzinfo=expires_at.tzinfo) <= expires_at:
+                if is_role_active(existing_invitation["invitation_expires_at"]):
                     raise HTTPException(status_code=400, detail="An invitation has already been sent to this email. Please wait for it to expire or resend the invitation.")
     except HTTPException:
         raise
@@ -1060,25 +1129,9 @@ async def invite_school_admin(
         # Check if user already has school_admin role for this school
         existing_role = supabase_admin.table("user_roles").select("id, expires_at").eq("user_id", user_id).eq("role", "school_admin").eq("school_id", school_id).eq("is_active", True).maybe_single().execute()
         
-        if existing_role.data:
-            # Check if role is not expired
-            expires_at = existing_role.data.get("expires_at")
-            if expires_at is None:
-                raise HTTPException(status_code=400, detail="User is already a school admin for this school")
-            else:
-                try:
-                    if isinstance(expires_at, str):
-                        if expires_at.endswith('Z'):
-                            expires_at = expires_at[:-1] + '+00:00'
-                        exp_dt = datetime.fromisoformat(expires_at)
-                        if exp_dt.tzinfo is None:
-                            exp_dt = exp_dt.replace(tzinfo=timezone.utc)
-                    else:
-                        exp_dt = expires_at
-                    if exp_dt > datetime.now(timezone.utc):
-                        raise HTTPException(status_code=400, detail="User is already a school admin for this school")
-                except:
-                    pass  # If expired or parsing fails, allow invitation
+        # An expired (or unparseable) role does not block a new invitation
+        if existing_role.data and is_role_active(existing_role.data.get("expires_at")):
+            raise HTTPException(status_code=400, detail="User is already a school admin for this school")
         
         # Check if user is school admin for another school
         other_school_role = supabase_admin.table("user_roles").select("school_id").eq("user_id", user_id).eq("role", "school_admin").eq("is_active", True).neq("school_id", school_id).maybe_single().execute()
@@ -1107,7 +1160,8 @@ async def invite_school_admin(
     if not invitation_result.data:
         raise HTTPException(status_code=500, detail="Failed to create invitation record")
     
-    # Send invitation email
+    # Queue invitation email (sent in the background after the response)
+    invitation_queued = False
     try:
         # Build invitation URL
         from app.config import settings
@@ -1127,64 +1181,16 @@ async def invite_school_admin(
         inviter_text = f" by {inviter_email}" if inviter_email else ""
         subject = f"Invitation to administer {school_name} on EigoKit"
         
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #3B82F6; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
-                .content {{ background: #f9fafb; padding: 30px; border-radius: 0 0 8px 8px; }}
-                .button {{ display: inline-block; padding: 12px 24px; background: #3B82F6; color: white; text-decoration: none; border-radius: 6px; margin: 20px 0; }}
-                .footer {{ text-align: center; margin-top: 20px; color: #6b7280; font-size: 12px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>EigoKit School Admin Invitation</h1>
-                </div>
-                <div class="content">
-                    <p>Hello {name},</p>
-                    <p>You have been invited{inviter_text} to administer <strong>{school_name}</strong> on EigoKit.</p>
-                    <p>EigoKit is an English learning platform that helps schools manage students, teachers, and classes.</p>
-                    <p style="text-align: center;">
-                        <a href="{invitation_url}" class="button">Accept Invitation</a>
-                    </p>
-                    <p>Or copy and paste this link into your browser:</p>
-                    <p style="word-break: break-all; color: #6b7280; font-size: 14px;">{invitation_url}</p>
-                    <p>This invitation link will expire in 7 days.</p>
-                    <p>If you didn't expect this invitation, you can safely ignore this email.</p>
-                </div>
-                <div class="footer">
-                    <p>© EigoKit - English Learning Platform</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        text_content = f"""
-        Hello {name},
-        
-        You have been invited{inviter_text} to administer {school_name} on EigoKit.
-        
-        EigoKit is an English learning platform that helps schools manage students, teachers, and classes.
-        
-        Accept your invitation by clicking this link:
-        {invitation_url}
-        
-        This invitation link will expire in 7 days.
-        
-        If you didn't expect this invitation, you can safely ignore this email.
-        
-        © EigoKit - English Learning Platform
-        """
+        template_vars = {
+            "name": name,
+            "inviter_text": inviter_text,
+            "school_name": school_name,
+            "invitation_url": invitation_url,
+        }
+        html_content = SCHOOL_ADMIN_INVITATION_HTML.render(**template_vars)
+        text_content = SCHOOL_ADMIN_INVITATION_TEXT.render(**template_vars)
         
         if email_service.resend:
-            emails = email_service.resend.Emails()
             params = {
                 "from": email_service.from_email,
                 "to": [email],
@@ -1192,19 +1198,22 @@ async def invite_school_admin(
                 "html": html_content,
                 "text": text_content,
             }
-            emails.send(params)
-            print(f"School admin invitation email sent to {email}")
+            await enqueue_email(email_service.send_email, params)
+            invitation_queued = True
+            logger.info(f"School admin invitation email queued for {email}")
         else:
-            print(f"Email service not available. Would send invitation to {email}")
-            print(f"Invitation URL: {invitation_url}")
-            print(f"Token: {invitation_token}")
+            # The token is returned in the response for manual sharing, so it is not logged
+            logger.info(f"Email service not available. Would send invitation to {email}")
     except Exception as e:
-        error_msg = str(e)
-        print(f"Error sending invitation email to {email}: {error_msg}")
         # Don't fail the request if email fails
+        logger.error(f"Error queueing invitation email to {email}: {str(e)}")
     
     return {
-        "message": "Invitation sent successfully",
+        "message": (
+            "Invitation created; the email will be sent shortly" if invitation_queued
+            else "Invitation created, but the email could not be sent"
+        ),
+        "invitation_queued": invitation_queued,
         "email": email,
         "invitation_id": invitation_result.data[0]["id"],
         "invitation_token": invitation_token  # Include for manual sharing if needed
@@ -1231,21 +1240,8 @@ async def update_school_admin(
         raise HTTPException(status_code=404, detail="Admin not found for this school")
     
     # Check if role is expired
-    expires_at = admin_role.data.get("expires_at")
-    if expires_at is not None:
-        try:
-            if isinstance(expires_at, str):
-                if expires_at.endswith('Z'):
-                    expires_at = expires_at[:-1] + '+00:00'
-                exp_dt = datetime.fromisoformat(expires_at)
-                if exp_dt.tzinfo is None:
-                    exp_dt = exp_dt.replace(tzinfo=timezone.utc)
-            else:
-                exp_dt = expires_at
-            if exp_dt <= datetime.now(timezone.utc):
-                raise HTTPException(status_code=404, detail="Admin role has expired")
-        except:
-            pass
+    if not is_role_active(admin_role.data.get("expires_at")):
+        raise HTTPException(status_code=404, detail="Admin role has expired")
     
     # Get admin email for validation
     admin_check = supabase_admin.table("users").select("email").eq("id", admin_id).single().execute()
@@ -1291,33 +1287,22 @@ async def delete_school_admin(
     if not check_school_access(user.user.id, school_id):
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Check if admin_id is a UUID (user ID) or invitation ID
-    # First, try to find it as a user ID with school_admin role for this school
-    admin_role = supabase_admin.table("user_roles").select("id").eq("user_id", admin_id).eq("role", "school_admin").eq("school_id", school_id).eq("is_active", True).maybe_single().execute()
-    
-    if admin_role.data:
-        # It's an existing user - remove their school_admin role for this school
-        # Don't allow deleting yourself
-        if admin_id == user.user.id:
-            raise HTTPException(status_code=400, detail="You cannot remove yourself from the school")
-        
-        # Deactivate the school_admin role for this school
-        supabase_admin.table("user_roles").update({
-            "is_active": False,
-            "updated_at": datetime.now().isoformat()
-        }).eq("user_id", admin_id).eq("role", "school_admin").eq("school_id", school_id).execute()
-        
+    # admin_id is either a user ID (active school_admin role) or a pending invitation ID.
+    # The database function checks both and applies the matching change in one call.
+    result = supabase_admin.rpc("remove_school_admin_or_invitation", {
+        "p_school_id": school_id,
+        "p_admin_id": admin_id,
+        "p_caller_id": user.user.id
+    }).execute()
+    outcome = result.data
+    
+    if outcome == "self":
+        raise HTTPException(status_code=400, detail="You cannot remove yourself from the school")
+    if outcome == "role":
         return {"message": "Admin removed from school successfully"}
-    else:
-        # Check if it's a pending invitation ID
-        invitation_check = supabase_admin.table("school_admin_invitations").select("id").eq("id", admin_id).eq("school_id", school_id).eq("invitation_status", "pending").maybe_single().execute()
-        
-        if invitation_check.data:
-            # Delete the pending invitation
-            supabase_admin.table("school_admin_invitations").delete().eq("id", admin_id).execute()
-            return {"message": "Pending invitation deleted successfully"}
-        else:
-            raise HTTPException(status_code=404, detail="Admin or invitation not found for this school")
+    if outcome == "invitation":
+        return {"message": "Pending invitation deleted successfully"}
+    raise HTTPException(status_code=404, detail="Admin or invitation not found for this school")
 
 
 @router.post("/{school_id}/admins/{admin_id}/resend-invitation")
@@ -1329,27 +1314,26 @@ async def resend_school_admin_invitation(
     """Resend invitation email to a school admin or pending invitation"""
     import secrets
     from datetime import datetime, timedelta
-    from app.services.email import email_service
+    from app.services.email import email_service, SCHOOL_ADMIN_INVITATION_HTML, SCHOOL_ADMIN_INVITATION_TEXT
     
     # Verify user's school_id matches
     # Verify user has access to this school (school_admin or platform_admin)
     if not check_school_access(user.user.id, school_id):
         raise HTTPException(status_code=403, detail="Access denied")
     
+    _check_resend_cooldown((school_id, admin_id))
+    
     # Get user email for later use
     user_data = supabase_admin.table("users").select("email").eq("id", user.user.id).single().execute()
     
     # Check if admin_id is a user ID or invitation ID
     # Check if user has school_admin role for this school
-    admin_role = supabase_admin.table("user_roles").select("id").eq("user_id", admin_id).eq("role", "school_admin").eq("school_id", school_id).eq("is_active", True).maybe_single().execute()
+    admin_role = supabase_admin.table("user_roles").select("id").eq("user_id", admin_id).eq("role", "school_admin").eq("school_id", school_id).eq("is_active", True).limit(1).execute()
     
     if admin_role.data:
-        # Get admin email
-        admin_check = supabase_admin.table("users").select("email").eq("id", admin_id).single().execute()
-    
-    if admin_check.data:
         # It's an existing user - get their email and find invitation
-        admin_email = admin_check.data.get("email")
+        admin_check = supabase_admin.table("users").select("email").eq("id", admin_id).single().execute()
+        admin_email = admin_check.data["email"]
         invitation_result = supabase_admin.table("school_admin_invitations").select("*").eq("email", admin_email).eq("school_id", school_id).order("created_at", desc=True).limit(1).execute()
     else:
         # Check if it's a pending invitation ID
@@ -1397,64 +1381,16 @@ async def resend_school_admin_invitation(
         inviter_text = f" by {inviter_email}" if inviter_email else ""
         subject = f"Invitation to administer {school_name} on EigoKit"
         
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #3B82F6; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
-                .content {{ background: #f9fafb; padding: 30px; border-radius: 0 0 8px 8px; }}
-                .button {{ display: inline-block; padding: 12px 24px; background: #3B82F6; color: white; text-decoration: none; border-radius: 6px; margin: 20px 0; }}
-                .footer {{ text-align: center; margin-top: 20px; color: #6b7280; font-size: 12px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>EigoKit School Admin Invitation</h1>
-                </div>
-                <div class="content">
-                    <p>Hello {invitation.get('name', 'there')},</p>
-                    <p>You have been invited{inviter_text} to administer <strong>{school_name}</strong> on EigoKit.</p>
-                    <p>EigoKit is an English learning platform that helps schools manage students, teachers, and classes.</p>
-                    <p style="text-align: center;">
-                        <a href="{invitation_url}" class="button">Accept Invitation</a>
-                    </p>
-                    <p>Or copy and paste this link into your browser:</p>
-                    <p style="word-break: break-all; color: #6b7280; font-size: 14px;">{invitation_url}</p>
-                    <p>This invitation link will expire in 7 days.</p>
-                    <p>If you didn't expect this invitation, you can safely ignore this email.</p>
-                </div>
-                <div class="footer">
-                    <p>© EigoKit - English Learning Platform</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        text_content = f"""
-        Hello {invitation.get('name', 'there')},
-        
-        You have been invited{inviter_text} to administer {school_name} on EigoKit.
-        
-        EigoKit is an English learning platform that helps schools manage students, teachers, and classes.
-        
-        Accept your invitation by clicking this link:
-        {invitation_url}
-        
-        This invitation link will expire in 7 days.
-        
-        If you didn't expect this invitation, you can safely ignore this email.
-        
-        © EigoKit - English Learning Platform
-        """
+        template_vars = {
+            "name": invitation.get('name', 'there'),
+            "inviter_text": inviter_text,
+            "school_name": school_name,
+            "invitation_url": invitation_url,
+        }
+        html_content = SCHOOL_ADMIN_INVITATION_HTML.render(**template_vars)
+        text_content = SCHOOL_ADMIN_INVITATION_TEXT.render(**template_vars)
         
         if email_service.resend:
-            emails = email_service.resend.Emails()
             params = {
                 "from": email_service.from_email,
                 "to": [admin_email],
@@ -1462,15 +1398,22 @@ async def resend_school_admin_invitation(
                 "html": html_content,
                 "text": text_content,
             }
-            emails.send(params)
-            print(f"School admin invitation email resent to {admin_email}")
+            # Start the cooldown before awaiting the send so a concurrent double click is
+            # rejected; a failed send clears it so the resend can be retried at once
+            _record_resend((school_id, admin_id))
+            try:
+                await asyncio.to_thread(email_service.send_email, params)
+            except Exception:
+                _clear_resend((school_id, admin_id))
+                raise
+            logger.info(f"School admin invitation email resent to {admin_email}")
             return {
                 "message": "Invitation email resent successfully",
                 "invitation_sent": True,
                 "invitation_token": invitation_token
             }
         else:
-            print(f"Email service not available. Would resend invitation to {admin_email}")
+            logger.info(f"Email service not available. Would resend invitation to {admin_email}")
             return {
                 "message": "Invitation token updated, but email service is not configured",
                 "invitation_sent": False,
@@ -1478,7 +1421,7 @@ async def resend_school_admin_invitation(
             }
     except Exception as e:
         error_msg = str(e)
-        print(f"Error resending invitation email to {admin_email}: {error_msg}")
+        logger.error(f"Error resending invitation email to {admin_email}: {error_msg}")
         return {
             "message": f"Invitation token updated, but email failed to send: {error_msg}",
             "invitation_sent": False,
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Body
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Body, Query
 from app.database import supabase, supabase_admin
 from app.models import StudentProgress, GameSession, GameType
 from app.auth import get_current_user
@@ -6,23 +6,106 @@ from app.config import settings
 import httpx
 import asyncio
 import logging
-from difflib import SequenceMatcher
+from typing import Optional
+from rapidfuzz.distance import Indel
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Game sessions are buffered and written in batches by a background task
+# (started from the app lifespan) to avoid one insert round trip per event.
+GAME_SESSION_BATCH_SIZE = 50
+GAME_SESSION_FLUSH_INTERVAL = 0.25  # seconds
+GAME_SESSION_QUEUE_SIZE = 5000
+_game_session_queue: Optional[asyncio.Queue] = None
+_game_session_writer: Optional[asyncio.Task] = None
+
+
+def _insert_game_sessions(rows: list):
+    # Nothing reads the inserted rows back, so skip RETURNING entirely
+    return supabase_admin.table("game_sessions").insert(rows, returning="minimal").execute()
+
+
+async def _flush_game_sessions(batch: list):
+    """
+    Insert a batch of queued game sessions.
+    
+    Clients were already told their session was queued, so if the batch insert
+    fails (e.g. one row references a deleted student) the rows are retried one
+    by one and only the rows that fail on their own are dropped and logged.
+    """
+    try:
+        await asyncio.to_thread(_insert_game_sessions, batch)
+        return
+    except Exception as e:
+        if len(batch) == 1:
+            logger.error(f"Dropped queued game session {batch[0]}: {str(e)}")
+            return
+        logger.warning(f"Failed to record {len(batch)} queued game sessions together, retrying one by one: {str(e)}")
+    
+    for row in batch:
+        try:
+            await asyncio.to_thread(_insert_game_sessions, [row])
+        except Exception as e:
+            logger.error(f"Dropped queued game session {row}: {str(e)}")
+
+
+async def _write_game_sessions(queue: asyncio.Queue):
+    """Collect queued sessions for up to GAME_SESSION_FLUSH_INTERVAL (or a full batch) and insert them together"""
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await queue.get()
+        if item is None:
+            return
+        batch = [item]
+        deadline = loop.time() + GAME_SESSION_FLUSH_INTERVAL
+        stop = False
+        while len(batch) < GAME_SESSION_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if item is None:
+                stop = True
+                break
+            batch.append(item)
+        await _flush_game_sessions(batch)
+        if stop:
+            return
+
+
+def start_game_session_writer():
+    """Start the background task that batches game session inserts"""
+    global _game_session_queue, _game_session_writer
+    _game_session_queue = asyncio.Queue(maxsize=GAME_SESSION_QUEUE_SIZE)
+    _game_session_writer = asyncio.create_task(_write_game_sessions(_game_session_queue))
+
+
+async def stop_game_session_writer():
+    """Flush any queued game sessions and stop the background writer"""
+    global _game_session_queue, _game_session_writer
+    queue, writer = _game_session_queue, _game_session_writer
+    # New requests insert directly from here on
+    _game_session_queue = None
+    _game_session_writer = None
+    if queue is not None and writer is not None:
+        await queue.put(None)
+        await writer
+
 
 @router.get("/{student_id}/progress")
 async def get_student_progress(student_id: str):
     """Get student progress dashboard data"""
     # Get student data
-    student = supabase.table("students").select("*").eq("id", student_id).single().execute()
+    student = supabase.table("students").select("name, streak_days, badges").eq("id", student_id).single().execute()
     if not student.data:
         raise HTTPException(status_code=404, detail="Student not found")
     
-    # Calculate progress from game sessions and surveys
-    game_sessions = supabase.table("game_sessions").select("*").eq("student_id", student_id).execute()
-    surveys = supabase.table("survey_responses").select("*").eq("student_id", student_id).execute()
+    # Calculate progress from game sessions
+    game_sessions = supabase.table("game_sessions").select("score").eq("student_id", student_id).execute()
     
     # Calculate vocabulary and grammar progress
     vocab_progress = 0.0
@@ -51,34 +134,48 @@ async def get_student_progress(student_id: str):
     return progress_dict
 
 
-@router.get("/{student_id}/leaderboard")
-async def get_student_leaderboard_position(student_id: str):
-    """Get student's position in class leaderboard"""
+def _compute_leaderboard_position(student_id: str):
+    """Rank a student within their class from live game session data"""
     student = supabase.table("students").select("class_id").eq("id", student_id).single().execute()
     if not student.data:
         raise HTTPException(status_code=404, detail="Student not found")
     
     class_id = student.data["class_id"]
     
-    # Get all students in class with their points
-    students = supabase.table("students").select("id, name").eq("class_id", class_id).execute()
+    # Get all students in class and their game scores in one query
+    students = supabase.table("students").select("id").eq("class_id", class_id).execute()
+    student_ids = [s["id"] for s in students.data]
+    points = {sid: 0 for sid in student_ids}
+    if student_ids:
+        games = supabase.table("game_sessions").select("student_id, score").in_("student_id", student_ids).execute()
+        for g in games.data:
+            points[g["student_id"]] += g.get("score") or 0
     
-    # Calculate points for each student
-    student_points = []
-    for s in students.data:
-        games = supabase.table("game_sessions").select("score").eq("student_id", s["id"]).execute()
-        total_points = sum([g.get("score", 0) for g in games.data])
-        student_points.append({"student_id": s["id"], "name": s["name"], "points": total_points})
-    
-    # Sort by points
-    student_points.sort(key=lambda x: x["points"], reverse=True)
+    # Sort by points, ties broken by student id (same order as class_leaderboard_mv)
+    ranking = sorted(student_ids, key=lambda sid: (-points[sid], sid))
     
     # Find current student's position
-    position = next((i + 1 for i, s in enumerate(student_points) if s["student_id"] == student_id), None)
+    position = next((i + 1 for i, sid in enumerate(ranking) if sid == student_id), None)
+    return position, len(ranking)
+
+
+@router.get("/{student_id}/leaderboard")
+async def get_student_leaderboard_position(student_id: str):
+    """Get student's position in class leaderboard"""
+    # Positions are precomputed in class_leaderboard_mv (see migrations/008); the view
+    # is readable by the service role only
+    ranking = supabase_admin.table("class_leaderboard_mv").select("position, total").eq("student_id", student_id).limit(1).execute()
+    
+    if ranking.data:
+        position = ranking.data[0]["position"]
+        total_students = ranking.data[0]["total"]
+    else:
+        # Student was added after the last refresh
+        position, total_students = _compute_leaderboard_position(student_id)
     
     return {
         "position": position,
-        "total_students": len(student_points),
+        "total_students": total_students,
         "categories": {
             "vocabulary": position,  # Simplified
             "grammar": position,
@@ -88,12 +185,19 @@ async def get_student_leaderboard_position(student_id: str):
 
 
 @router.post("/{student_id}/game-session")
-async def create_game_session(student_id: str, session: dict = Body(...)):
+async def create_game_session(
+    student_id: str,
+    session: dict = Body(...),
+    flush: bool = Query(False, description="Insert immediately and return the session id (e.g. for the last event of a game)"),
+):
     """
     Record a game session.
 
     Uses a plain dict instead of Pydantic model to be more forgiving about
     the payload coming from the frontend games.
+
+    Sessions are queued and inserted in batches unless flush=true, in which
+    case the row is written before responding and its id is returned.
     """
     try:
         game_type_raw = session.get("game_type")
@@ -118,8 +222,12 @@ async def create_game_session(student_id: str, session: dict = Body(...)):
             "difficulty_level": difficulty_level,
         }
 
+        if not flush and _game_session_queue is not None:
+            await _game_session_queue.put(session_data)
+            return {"queued": True, "message": "Game session queued"}
+
         # Use admin client to bypass RLS when recording sessions
-        result = supabase_admin.table("game_sessions").insert(session_data).execute()
+        result = supabase_admin.table("game_sessions").insert(session_data).select("id").execute()
         return {"session_id": result.data[0]["id"], "message": "Game session recorded"}
     except HTTPException:
         raise
@@ -128,6 +236,24 @@ async def create_game_session(student_id: str, session: dict = Body(...)):
         raise HTTPException(status_code=500, detail="Failed to record game session")
 
 
+AUDIO_UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Shared across requests; closed from the app lifespan
+_assemblyai_client = httpx.AsyncClient(timeout=60)
+
+
+async def close_assemblyai_client():
+    """Close the pooled AssemblyAI HTTP client"""
+    await _assemblyai_client.aclose()
+
+
+async def _iter_audio_chunks(audio: UploadFile, first_chunk: bytes):
+    """Stream an uploaded audio file in chunks instead of buffering it in memory"""
+    yield first_chunk
+    while chunk := await audio.read(AUDIO_UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
 @router.post("/{student_id}/pronunciation-eval")
 async def evaluate_pronunciation(
     student_id: str,
@@ -154,92 +280,95 @@ async def evaluate_pronunciation(
         )
 
     try:
-        audio_bytes = await audio.read()
-        if not audio_bytes:
+        first_chunk = await audio.read(AUDIO_UPLOAD_CHUNK_SIZE)
+        if not first_chunk:
             raise HTTPException(status_code=400, detail="Empty audio file.")
 
         headers = {"authorization": api_key}
 
-        async with httpx.AsyncClient(timeout=60) as client:
-            # 1) Upload audio
-            upload_resp = await client.post(
-                "https://api.assemblyai.com/v2/upload", content=audio_bytes, headers=headers
+        # Reuse pooled connections to AssemblyAI instead of a new TLS handshake per request
+        client = _assemblyai_client
+        # 1) Upload audio
+        upload_resp = await client.post(
+            "https://api.assemblyai.com/v2/upload",
+            content=_iter_audio_chunks(audio, first_chunk),
+            headers=headers,
+        )
+        upload_resp.raise_for_status()
+        upload_url = upload_resp.json().get("upload_url")
+
+        if not upload_url:
+            logger.error("AssemblyAI upload failed: no upload_url in response")
+            raise HTTPException(
+                status_code=502, detail="Failed to upload audio for pronunciation check."
             )
-            upload_resp.raise_for_status()
-            upload_url = upload_resp.json().get("upload_url")
 
-            if not upload_url:
-                logger.error("AssemblyAI upload failed: no upload_url in response")
-                raise HTTPException(
-                    status_code=502, detail="Failed to upload audio for pronunciation check."
-                )
+        # 2) Request transcription
+        transcript_req = {
+            "audio_url": upload_url,
+            "language_code": "en_us",
+            # Bias recognition toward the expected phrase
+            "word_boost": [reference_text],
+            "boost_param": "high",
+        }
+
+        transcribe_resp = await client.post(
+            "https://api.assemblyai.com/v2/transcript",
+            json=transcript_req,
+            headers=headers,
+        )
+        transcribe_resp.raise_for_status()
+        transcript_id = transcribe_resp.json().get("id")
 
-            # 2) Request transcription
-            transcript_req = {
-                "audio_url": upload_url,
-                "language_code": "en_us",
-                # Bias recognition toward the expected phrase
-                "word_boost": [reference_text],
-                "boost_param": "high",
-            }
-
-            transcribe_resp = await client.post(
-                "https://api.assemblyai.com/v2/transcript",
-                json=transcript_req,
+        if not transcript_id:
+            logger.error("AssemblyAI transcription creation failed: no id in response")
+            raise HTTPException(
+                status_code=502, detail="Failed to start pronunciation analysis."
+            )
+
+        # 3) Poll for completion
+        status = "queued"
+        transcript_text = ""
+        for _ in range(20):  # up to ~20 seconds
+            poll_resp = await client.get(
+                f"https://api.assemblyai.com/v2/transcript/{transcript_id}",
                 headers=headers,
             )
-            transcribe_resp.raise_for_status()
-            transcript_id = transcribe_resp.json().get("id")
+            poll_resp.raise_for_status()
+            data = poll_resp.json()
+            status = data.get("status")
 
-            if not transcript_id:
-                logger.error("AssemblyAI transcription creation failed: no id in response")
+            if status == "completed":
+                transcript_text = (data.get("text") or "").strip()
+                break
+            if status in {"error", "failed"}:
+                logger.error(f"AssemblyAI transcription error: {data}")
                 raise HTTPException(
-                    status_code=502, detail="Failed to start pronunciation analysis."
+                    status_code=502,
+                    detail="Pronunciation service reported an error while processing audio.",
                 )
 
-            # 3) Poll for completion
-            status = "queued"
-            transcript_text = ""
-            for _ in range(20):  # up to ~20 seconds
-                poll_resp = await client.get(
-                    f"https://api.assemblyai.com/v2/transcript/{transcript_id}",
-                    headers=headers,
-                )
-                poll_resp.raise_for_status()
-                data = poll_resp.json()
-                status = data.get("status")
-
-                if status == "completed":
-                    transcript_text = (data.get("text") or "").strip()
-                    break
-                if status in {"error", "failed"}:
-                    logger.error(f"AssemblyAI transcription error: {data}")
-                    raise HTTPException(
-                        status_code=502,
-                        detail="Pronunciation service reported an error while processing audio.",
-                    )
-
-                await asyncio.sleep(1)
-
-            if status != "completed":
-                logger.error(f"AssemblyAI transcription timeout, last status={status}")
-                raise HTTPException(
-                    status_code=504,
-                    detail="Pronunciation service took too long to respond.",
-                )
+            await asyncio.sleep(1)
+
+        if status != "completed":
+            logger.error(f"AssemblyAI transcription timeout, last status={status}")
+            raise HTTPException(
+                status_code=504,
+                detail="Pronunciation service took too long to respond.",
+            )
 
-            # 4) Simple similarity scoring between transcript and reference
-            ref = reference_text.lower().strip()
-            hyp = transcript_text.lower().strip()
-            similarity = SequenceMatcher(None, ref, hyp).ratio()
-            score = round(similarity * 100, 2)
-
-            return {
-                "student_id": student_id,
-                "reference_text": reference_text,
-                "transcript": transcript_text,
-                "similarity_score": score,
-            }
+        # 4) Simple similarity scoring between transcript and reference
+        ref = reference_text.lower().strip()
+        hyp = transcript_text.lower().strip()
+        similarity = Indel.normalized_similarity(ref, hyp)
+        score = round(similarity * 100, 2)
+
+        return {
+            "student_id": student_id,
+            "reference_text": reference_text,
+            "transcript": transcript_text,
+            "similarity_score": score,
+        }
 
     except HTTPException:
         raise
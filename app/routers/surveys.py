@@ -7,16 +7,20 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Columns returned to students; teacher_id and timestamps are not needed to answer a survey
+SURVEY_QUESTION_COLUMNS = "id, class_id, question_type, question_text, question_text_jp, options"
+SURVEY_RESPONSE_COLUMNS = "id, lesson_id, question_id, response, created_at"
+
 
 @router.get("/questions/{class_id}")
 async def get_survey_questions_for_class(class_id: str):
     """Get survey questions for a class (includes class-specific and global surveys)"""
     # Get class-specific questions
-    class_questions_result = supabase_admin.table("survey_questions").select("*").eq("class_id", class_id).execute()
+    class_questions_result = supabase_admin.table("survey_questions").select(SURVEY_QUESTION_COLUMNS).eq("class_id", class_id).execute()
     class_questions = class_questions_result.data or []
     
     # Get global questions (class_id IS NULL - available to all classes)
-    global_questions_result = supabase_admin.table("survey_questions").select("*").is_("class_id", None).execute()
+    global_questions_result = supabase_admin.table("survey_questions").select(SURVEY_QUESTION_COLUMNS).is_("class_id", None).execute()
     global_questions = global_questions_result.data or []
     
     # Combine and deduplicate by id
@@ -42,7 +46,7 @@ async def submit_survey_response(response: SurveyResponse):
         }
         
         # Use supabase_admin to bypass RLS policies for insert
-        result = supabase_admin.table("survey_responses").insert(response_data).execute()
+        result = supabase_admin.table("survey_responses").insert(response_data).select("id").execute()
         
         if not result.data:
             logger.error(f"Failed to insert survey response: {response_data}")
@@ -61,7 +65,7 @@ async def submit_survey_response(response: SurveyResponse):
 @router.get("/responses/{student_id}")
 async def get_student_responses(student_id: str):
     """Get survey responses for a student"""
-    responses = supabase.table("survey_responses").select("*").eq("student_id", student_id).execute()
+    responses = supabase.table("survey_responses").select(SURVEY_RESPONSE_COLUMNS).eq("student_id", student_id).execute()
     return {"responses": responses.data}
 
 
@@ -1,26 +1,139 @@
-from fastapi import APIRouter, Depends, HTTPException, Form
-from app.database import supabase, supabase_admin
+from fastapi import APIRouter, Depends, HTTPException, Form, Query, Request
+from app.database import supabase, supabase_admin, run_query
 from app.models import SurveyQuestion, Vocabulary, Grammar
 from app.auth import get_current_user
-from app.services.icon_password import generate_student_icon_sequence, get_icons_by_ids
+from app.responses import ORJSONResponse, etag_json_response, streaming_json_response
+from app.services.icon_password import (
+    generate_student_icon_sequence, get_icons_by_ids, parse_icon_sequence, remember_icon_sequence,
+)
 from typing import List, Optional
+from cachetools import TTLCache
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Columns the list endpoints return by default. Clients can ask for a narrower
+# projection with ?fields=a,b,c (restricted to these columns).
+STUDENT_COLUMNS = (
+    "id", "name", "class_id", "icon_sequence", "registration_status",
+    "streak_days", "badges", "created_at", "updated_at",
+)
+VOCABULARY_COLUMNS = (
+    "id", "teacher_id", "class_id", "student_id", "english_word", "japanese_word",
+    "example_sentence", "audio_url", "is_current_lesson", "scheduled_date", "created_at", "updated_at",
+)
+GRAMMAR_COLUMNS = (
+    "id", "teacher_id", "class_id", "student_id", "rule_name", "rule_description",
+    "examples", "is_current_lesson", "scheduled_date", "created_at", "updated_at",
+)
+CLASS_COLUMNS = (
+    "id", "name", "school_id", "teacher_id", "location_id", "created_at", "updated_at",
+)
+SURVEY_QUESTION_COLUMNS = (
+    "id", "teacher_id", "class_id", "question_type", "question_text", "question_text_jp",
+    "options", "created_at", "updated_at",
+)
+
+# Upper bound on rows accepted by the bulk insert endpoints, so one request
+# cannot turn into an oversized INSERT statement.
+MAX_BULK_ITEMS = 500
+
+
+# The teacher UI polls the list endpoints with the same arguments several times a
+# minute. Their results are cached briefly, keyed by (teacher_id, endpoint, args...).
+# Writes made through this router drop the teacher's entries; changes made
+# elsewhere (student survey answers, game sessions) show up once the TTL expires.
+READ_CACHE_TTL_SECONDS = 15
+_read_cache: TTLCache = TTLCache(maxsize=2048, ttl=READ_CACHE_TTL_SECONDS)
+
+
+async def _cached_query(key: tuple, query):
+    """Run a query, reusing the result cached under key if it is still fresh"""
+    result = _read_cache.get(key)
+    if result is None:
+        result = await run_query(query)
+        _read_cache[key] = result
+    return result
+
+
+def _invalidate_read_cache(teacher_id: Optional[str] = None) -> None:
+    """Drop cached reads for a teacher, or for every teacher when teacher_id is None"""
+    if teacher_id is None:
+        _read_cache.clear()
+        return
+    for key in [k for k in list(_read_cache.keys()) if k[0] == teacher_id]:
+        _read_cache.pop(key, None)
+
+
+# teacher_id -> school_id used when a teacher creates a class. Memberships rarely
+# change; removing a teacher from a school calls forget_teacher_school.
+_teacher_school_cache: TTLCache = TTLCache(maxsize=4096, ttl=600)
+
+
+def forget_teacher_school(teacher_id: str) -> None:
+    """Drop a teacher's cached school (call when their school membership changes)"""
+    _teacher_school_cache.pop(teacher_id, None)
+
+
+def _select_columns(fields: Optional[str], allowed: tuple) -> str:
+    """Build a PostgREST select list from a comma-separated ?fields= value"""
+    if not fields:
+        return ",".join(allowed)
+    
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    
+    # Rows are always identifiable
+    if "id" not in requested:
+        requested.insert(0, "id")
+    return ",".join(requested)
+
+
+def _page_count_method(limit: Optional[int], offset: int) -> Optional[str]:
+    """Exact total on the first page; the planner's estimate on later pages avoids a COUNT(*) per page"""
+    if limit is None:
+        return None
+    return "exact" if offset == 0 else "planned"
+
+
+def _page_headers(limit: Optional[int], offset: int, result) -> Optional[dict]:
+    """Content-Range header (e.g. 0-49/1234) for a paginated result"""
+    if limit is None:
+        return None
+    rows = len(result.data)
+    row_range = f"{offset}-{offset + rows - 1}" if rows else "*"
+    total = result.count if result.count is not None else "*"
+    return {"Content-Range": f"{row_range}/{total}"}
 
 
 @router.get("/{teacher_id}/students")
-async def get_teacher_students(teacher_id: str):
-    """Get all students for a teacher"""
-    # Get teacher's classes
-    classes = supabase.table("classes").select("id").eq("teacher_id", teacher_id).execute()
-    class_ids = [c["id"] for c in classes.data]
+async def get_teacher_students(
+    request: Request,
+    teacher_id: str,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    """Get all students for a teacher (paginated when limit is given)"""
+    columns = _select_columns(fields, STUDENT_COLUMNS)
     
-    # Get students from those classes
-    students = supabase.table("students").select("*").in_("class_id", class_ids).execute()
-    return {"students": students.data}
+    # Join students to the teacher's classes server-side in a single request. The
+    # embed only carries the class name; class_id is on the row and teacher_id is the filter.
+    query = (
+        supabase.table("students")
+        .select(f"{columns}, classes!inner(name)", count=_page_count_method(limit, offset))
+        .eq("classes.teacher_id", teacher_id)
+    )
+    if limit is not None:
+        query = query.order("created_at").order("id").range(offset, offset + limit - 1)
+    
+    students = await _cached_query((teacher_id, "students", columns, limit, offset), query)
+    return etag_json_response(request, {"students": students.data}, headers=_page_headers(limit, offset, students))
 
 
 @router.post("/{teacher_id}/students")
@@ -32,21 +145,16 @@ async def add_student(
 ):
     """Add a new student to a class"""
     try:
-        # Verify teacher owns the class
-        class_check = supabase.table("classes").select("teacher_id").eq("id", class_id).single().execute()
-        if not class_check.data:
+        # Verify teacher owns the class and get its school_id in one lookup
+        class_info = await run_query(supabase_admin.table("classes").select("teacher_id, school_id").eq("id", class_id).maybe_single())
+        if not class_info or not class_info.data:
             logger.warning(f"Class not found: class_id={class_id}, teacher_id={teacher_id}")
             raise HTTPException(status_code=404, detail="Class not found")
         
-        if class_check.data["teacher_id"] != teacher_id:
-            logger.warning(f"Teacher not authorized for class: class_id={class_id}, teacher_id={teacher_id}, class_teacher_id={class_check.data['teacher_id']}")
+        if class_info.data["teacher_id"] != teacher_id:
+            logger.warning(f"Teacher not authorized for class: class_id={class_id}, teacher_id={teacher_id}, class_teacher_id={class_info.data['teacher_id']}")
             raise HTTPException(status_code=403, detail="Not authorized for this class")
         
-        # Get school_id from class
-        class_info = supabase_admin.table("classes").select("school_id").eq("id", class_id).single().execute()
-        if not class_info.data:
-            raise HTTPException(status_code=404, detail="Class not found")
-        
         school_id = class_info.data["school_id"]
         
         student_data = {
@@ -58,7 +166,7 @@ async def add_student(
         # Auto-generate icon sequence if not provided
         if icon_sequence:
             try:
-                icon_array = [int(x.strip()) for x in icon_sequence.split(",")]
+                icon_array = parse_icon_sequence(icon_sequence)
                 if len(icon_array) != 5:
                     raise HTTPException(status_code=400, detail="Icon sequence must contain exactly 5 icons")
                 student_data["icon_sequence"] = icon_array
@@ -70,18 +178,22 @@ async def add_student(
                 )
         else:
             # Auto-generate unique 5-icon sequence
-            generated_sequence = generate_student_icon_sequence(supabase_admin, school_id)
+            generated_sequence = await asyncio.to_thread(generate_student_icon_sequence, supabase_admin, school_id)
             if not generated_sequence:
                 raise HTTPException(status_code=500, detail="Failed to generate unique icon sequence")
             student_data["icon_sequence"] = generated_sequence
             logger.info(f"Auto-generated icon sequence for student: {generated_sequence}")
 
         # Use supabase_admin to bypass RLS policies for insert
-        result = supabase_admin.table("students").insert(student_data).execute()
+        result = await run_query(supabase_admin.table("students").insert(student_data))
         if not result.data:
             logger.error(f"Failed to insert student: {student_data}")
             raise HTTPException(status_code=500, detail="Failed to create student")
         
+        if icon_sequence:
+            remember_icon_sequence(school_id, student_data["icon_sequence"])
+        _invalidate_read_cache(teacher_id)
+        
         logger.info(f"Student added successfully: student_id={result.data[0]['id']}, name={name}, class_id={class_id}")
         return {"student_id": result.data[0]["id"], "message": "Student added", "student": result.data[0]}
     
@@ -104,7 +216,9 @@ async def update_student(student_id: str, name: str = None, class_id: str = None
         update_data["class_id"] = class_id
     
     # Use supabase_admin to bypass RLS policies for update
-    supabase_admin.table("students").update(update_data).eq("id", student_id).execute()
+    await run_query(supabase_admin.table("students").update(update_data).eq("id", student_id))
+    # The owning teacher is not known here
+    _invalidate_read_cache()
     return {"message": "Student updated"}
 
 
@@ -112,7 +226,9 @@ async def update_student(student_id: str, name: str = None, class_id: str = None
 async def delete_student(student_id: str):
     """Remove student from class"""
     # Use supabase_admin to bypass RLS policies for delete
-    supabase_admin.table("students").delete().eq("id", student_id).execute()
+    await run_query(supabase_admin.table("students").delete().eq("id", student_id))
+    # The owning teacher is not known here
+    _invalidate_read_cache()
     return {"message": "Student removed"}
 
 
@@ -120,9 +236,9 @@ async def delete_student(student_id: str):
 async def get_student_detail(student_id: str):
     """Get detailed student information including icon sequence"""
     try:
-        student = supabase_admin.table("students").select("*, classes(school_id, name)").eq("id", student_id).single().execute()
+        student = await run_query(supabase_admin.table("students").select("*, classes(school_id, name)").eq("id", student_id).maybe_single())
         
-        if not student.data:
+        if not student or not student.data:
             raise HTTPException(status_code=404, detail="Student not found")
         
         student_info = student.data
@@ -147,38 +263,42 @@ async def get_student_detail(student_id: str):
 async def reset_student_auth(teacher_id: str, student_id: str):
     """Reset student authentication and generate new icon sequence"""
     try:
-        # Verify teacher has access to this student
-        student = supabase_admin.table("students").select("class_id").eq("id", student_id).single().execute()
-        if not student.data:
+        # Verify teacher has access to this student; the class (teacher and school) is embedded
+        student = await run_query(
+            supabase_admin.table("students").select("class_id, classes!inner(school_id, teacher_id)").eq("id", student_id).maybe_single()
+        )
+        if not student or not student.data:
             raise HTTPException(status_code=404, detail="Student not found")
         
-        class_id = student.data["class_id"]
-        
-        # Get class info to verify teacher and get school_id
-        class_info = supabase_admin.table("classes").select("school_id, teacher_id").eq("id", class_id).single().execute()
-        if not class_info.data:
+        class_info = student.data["classes"]
+        if not class_info:
             raise HTTPException(status_code=404, detail="Class not found")
         
-        if class_info.data["teacher_id"] != teacher_id:
+        if class_info["teacher_id"] != teacher_id:
             raise HTTPException(status_code=403, detail="Not authorized")
         
-        school_id = class_info.data["school_id"]
+        school_id = class_info["school_id"]
         
         # Generate new unique icon sequence
-        new_sequence = generate_student_icon_sequence(supabase_admin, school_id, student_id=student_id)
+        new_sequence = await asyncio.to_thread(generate_student_icon_sequence, supabase_admin, school_id, student_id=student_id)
         
         if not new_sequence:
             raise HTTPException(status_code=500, detail="Failed to generate new icon sequence")
         
-        # Use supabase_admin to bypass RLS policies for update
-        supabase_admin.table("students").update({
+        # Use supabase_admin to bypass RLS policies for update.
+        # Only update if the student is still in the class checked above, so a move
+        # to another teacher's class in the meantime is not overwritten.
+        updated = await run_query(supabase_admin.table("students").update({
             "icon_sequence": new_sequence,
             "registration_status": "pending"
-        }).eq("id", student_id).execute()
+        }).eq("id", student_id).eq("class_id", student.data["class_id"]).select("id"))
+        if not updated.data:
+            raise HTTPException(status_code=409, detail="Student changed class; please retry")
         
         # Get icon details for response
         icons = get_icons_by_ids(new_sequence)
         
+        _invalidate_read_cache(teacher_id)
         logger.info(f"Reset icon sequence for student {student_id}: {new_sequence}")
         return {
             "message": "Student authentication reset",
@@ -192,10 +312,8 @@ async def reset_student_auth(teacher_id: str, student_id: str):
         raise HTTPException(status_code=500, detail="Failed to reset student authentication")
 
 
-@router.post("/{teacher_id}/vocabulary")
-async def add_vocabulary(teacher_id: str, vocab: Vocabulary):
-    """Add vocabulary to class or student"""
-    vocab_data = {
+def _vocabulary_row(teacher_id: str, vocab: Vocabulary) -> dict:
+    return {
         "teacher_id": teacher_id,
         # Convert empty strings to NULL for optional UUID columns
         "class_id": vocab.class_id or None,
@@ -207,15 +325,10 @@ async def add_vocabulary(teacher_id: str, vocab: Vocabulary):
         "is_current_lesson": vocab.is_current_lesson,
         "scheduled_date": vocab.scheduled_date.isoformat() if vocab.scheduled_date else None
     }
-    
-    result = supabase_admin.table("vocabulary").insert(vocab_data).execute()
-    return {"vocab_id": result.data[0]["id"], "message": "Vocabulary added"}
 
 
-@router.post("/{teacher_id}/grammar")
-async def add_grammar(teacher_id: str, grammar: Grammar):
-    """Add grammar rule to class or student"""
-    grammar_data = {
+def _grammar_row(teacher_id: str, grammar: Grammar) -> dict:
+    return {
         "teacher_id": teacher_id,
         # Convert empty strings to NULL for optional UUID columns
         "class_id": grammar.class_id or None,
@@ -226,39 +339,149 @@ async def add_grammar(teacher_id: str, grammar: Grammar):
         "is_current_lesson": grammar.is_current_lesson,
         "scheduled_date": grammar.scheduled_date.isoformat() if grammar.scheduled_date else None
     }
+
+
+def _survey_question_row(teacher_id: str, question: SurveyQuestion) -> dict:
+    # Convert empty string to None for optional class_id
+    class_id = question.class_id if question.class_id and question.class_id.strip() else None
+    return {
+        "teacher_id": teacher_id,
+        "class_id": class_id,
+        "question_type": question.question_type.value,
+        "question_text": question.question_text,
+        "question_text_jp": question.question_text_jp if question.question_text_jp else None,
+        "options": question.options if question.options else None
+    }
+
+
+@router.post("/{teacher_id}/vocabulary")
+async def add_vocabulary(teacher_id: str, vocab: Vocabulary):
+    """Add vocabulary to class or student"""
+    vocab_data = _vocabulary_row(teacher_id, vocab)
     
-    result = supabase_admin.table("grammar").insert(grammar_data).execute()
+    result = await run_query(supabase_admin.table("vocabulary").insert(vocab_data).select("id"))
+    _invalidate_read_cache(teacher_id)
+    return {"vocab_id": result.data[0]["id"], "message": "Vocabulary added"}
+
+
+@router.post("/{teacher_id}/vocabulary/bulk")
+async def add_vocabulary_bulk(teacher_id: str, items: List[Vocabulary]):
+    """Add several vocabulary items in a single insert"""
+    if not items:
+        raise HTTPException(status_code=400, detail="No vocabulary items provided")
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ITEMS} vocabulary items can be added at once")
+    
+    rows = [_vocabulary_row(teacher_id, vocab) for vocab in items]
+    result = await run_query(supabase_admin.table("vocabulary").insert(rows).select("id"))
+    _invalidate_read_cache(teacher_id)
+    return {"vocab_ids": [row["id"] for row in result.data], "message": f"{len(result.data)} vocabulary items added"}
+
+
+@router.post("/{teacher_id}/grammar")
+async def add_grammar(teacher_id: str, grammar: Grammar):
+    """Add grammar rule to class or student"""
+    grammar_data = _grammar_row(teacher_id, grammar)
+    
+    result = await run_query(supabase_admin.table("grammar").insert(grammar_data).select("id"))
+    _invalidate_read_cache(teacher_id)
     return {"grammar_id": result.data[0]["id"], "message": "Grammar added"}
 
 
+@router.post("/{teacher_id}/grammar/bulk")
+async def add_grammar_bulk(teacher_id: str, items: List[Grammar]):
+    """Add several grammar rules in a single insert"""
+    if not items:
+        raise HTTPException(status_code=400, detail="No grammar rules provided")
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ITEMS} grammar rules can be added at once")
+    
+    rows = [_grammar_row(teacher_id, grammar) for grammar in items]
+    result = await run_query(supabase_admin.table("grammar").insert(rows).select("id"))
+    _invalidate_read_cache(teacher_id)
+    return {"grammar_ids": [row["id"] for row in result.data], "message": f"{len(result.data)} grammar rules added"}
+
+
 @router.get("/{teacher_id}/vocabulary")
-async def get_vocabulary(teacher_id: str, class_id: str = None):
-    """Get vocabulary for teacher"""
-    query = supabase.table("vocabulary").select("*").eq("teacher_id", teacher_id)
+async def get_vocabulary(
+    request: Request,
+    teacher_id: str,
+    class_id: str = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    """Get vocabulary for teacher (paginated when limit is given)"""
+    columns = _select_columns(fields, VOCABULARY_COLUMNS)
+    query = supabase.table("vocabulary").select(columns, count=_page_count_method(limit, offset)).eq("teacher_id", teacher_id)
     if class_id:
         query = query.eq("class_id", class_id)
+    if limit is not None:
+        query = query.order("created_at").order("id").range(offset, offset + limit - 1)
+    
+    result = await _cached_query((teacher_id, "vocabulary", class_id, columns, limit, offset), query)
+    return etag_json_response(request, {"vocabulary": result.data}, headers=_page_headers(limit, offset, result))
+
+
+@router.get("/{teacher_id}/vocabulary/{vocab_id}")
+async def get_vocabulary_detail(request: Request, teacher_id: str, vocab_id: str):
+    """Get a single vocabulary item with all of its fields"""
+    result = await run_query(
+        supabase.table("vocabulary")
+        .select(",".join(VOCABULARY_COLUMNS))
+        .eq("id", vocab_id)
+        .eq("teacher_id", teacher_id)
+        .limit(1)
+    )
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Vocabulary not found")
     
-    result = query.execute()
-    return {"vocabulary": result.data}
+    return etag_json_response(request, {"vocabulary": result.data[0]})
 
 
 @router.get("/{teacher_id}/grammar")
-async def get_grammar(teacher_id: str, class_id: str = None):
-    """Get grammar for teacher"""
-    query = supabase.table("grammar").select("*").eq("teacher_id", teacher_id)
+async def get_grammar(
+    request: Request,
+    teacher_id: str,
+    class_id: str = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    """Get grammar for teacher (paginated when limit is given)"""
+    columns = _select_columns(fields, GRAMMAR_COLUMNS)
+    query = supabase.table("grammar").select(columns, count=_page_count_method(limit, offset)).eq("teacher_id", teacher_id)
     if class_id:
         query = query.eq("class_id", class_id)
+    if limit is not None:
+        query = query.order("created_at").order("id").range(offset, offset + limit - 1)
+    
+    result = await _cached_query((teacher_id, "grammar", class_id, columns, limit, offset), query)
+    return etag_json_response(request, {"grammar": result.data}, headers=_page_headers(limit, offset, result))
+
+
+@router.get("/{teacher_id}/grammar/{grammar_id}")
+async def get_grammar_detail(request: Request, teacher_id: str, grammar_id: str):
+    """Get a single grammar rule with all of its fields"""
+    result = await run_query(
+        supabase.table("grammar")
+        .select(",".join(GRAMMAR_COLUMNS))
+        .eq("id", grammar_id)
+        .eq("teacher_id", teacher_id)
+        .limit(1)
+    )
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Grammar rule not found")
     
-    result = query.execute()
-    return {"grammar": result.data}
+    return etag_json_response(request, {"grammar": result.data[0]})
 
 
 @router.put("/{teacher_id}/grammar/{grammar_id}")
 async def update_grammar(teacher_id: str, grammar_id: str, grammar: Grammar):
     """Update an existing grammar rule"""
     # Verify the grammar belongs to this teacher
-    grammar_check = supabase_admin.table("grammar").select("teacher_id").eq("id", grammar_id).single().execute()
-    if not grammar_check.data or grammar_check.data["teacher_id"] != teacher_id:
+    grammar_check = await run_query(supabase_admin.table("grammar").select("teacher_id").eq("id", grammar_id).maybe_single())
+    if not grammar_check or not grammar_check.data or grammar_check.data["teacher_id"] != teacher_id:
         raise HTTPException(status_code=404, detail="Grammar rule not found")
     
     grammar_data = {
@@ -271,48 +494,64 @@ async def update_grammar(teacher_id: str, grammar_id: str, grammar: Grammar):
         "scheduled_date": grammar.scheduled_date.isoformat() if grammar.scheduled_date else None
     }
     
-    result = supabase_admin.table("grammar").update(grammar_data).eq("id", grammar_id).execute()
+    result = await run_query(supabase_admin.table("grammar").update(grammar_data).eq("id", grammar_id))
+    _invalidate_read_cache(teacher_id)
     return {"message": "Grammar updated", "grammar": result.data[0]}
 
 
 @router.post("/{teacher_id}/survey-questions")
 async def create_survey_question(teacher_id: str, question: SurveyQuestion):
     """Create a survey question"""
-    # Convert empty string to None for optional class_id
-    class_id = question.class_id if question.class_id and question.class_id.strip() else None
-    
-    question_data = {
-        "teacher_id": teacher_id,
-        "class_id": class_id,
-        "question_type": question.question_type.value,
-        "question_text": question.question_text,
-        "question_text_jp": question.question_text_jp if question.question_text_jp else None,
-        "options": question.options if question.options else None
-    }
+    question_data = _survey_question_row(teacher_id, question)
     
     # Use supabase_admin to bypass RLS policies for insert
-    result = supabase_admin.table("survey_questions").insert(question_data).execute()
+    result = await run_query(supabase_admin.table("survey_questions").insert(question_data).select("id"))
     if not result.data:
         raise HTTPException(status_code=500, detail="Failed to create question")
     
+    _invalidate_read_cache(teacher_id)
     return {"question_id": result.data[0]["id"], "message": "Question created"}
 
 
+@router.post("/{teacher_id}/survey-questions/bulk")
+async def create_survey_questions_bulk(teacher_id: str, items: List[SurveyQuestion]):
+    """Create several survey questions in a single insert"""
+    if not items:
+        raise HTTPException(status_code=400, detail="No survey questions provided")
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ITEMS} survey questions can be added at once")
+    
+    rows = [_survey_question_row(teacher_id, question) for question in items]
+    # Use supabase_admin to bypass RLS policies for insert
+    result = await run_query(supabase_admin.table("survey_questions").insert(rows).select("id"))
+    if not result.data:
+        raise HTTPException(status_code=500, detail="Failed to create questions")
+    
+    _invalidate_read_cache(teacher_id)
+    return {"question_ids": [row["id"] for row in result.data], "message": f"{len(result.data)} questions created"}
+
+
 @router.get("/{teacher_id}/survey-questions")
-async def get_survey_questions(teacher_id: str, class_id: str = None):
+async def get_survey_questions(request: Request, teacher_id: str, class_id: str = None, fields: Optional[str] = None):
     """Get survey questions for teacher with response counts"""
-    query = supabase.table("survey_questions").select("*").eq("teacher_id", teacher_id)
+    columns = _select_columns(fields, SURVEY_QUESTION_COLUMNS)
+    cache_key = (teacher_id, "survey_questions", class_id, columns)
+    questions = _read_cache.get(cache_key)
+    if questions is not None:
+        return etag_json_response(request, {"questions": questions})
+    
+    query = supabase.table("survey_questions").select(columns).eq("teacher_id", teacher_id)
     if class_id:
         query = query.eq("class_id", class_id)
     
-    result = query.execute()
+    result = await run_query(query)
     questions = result.data or []
     
     # Get response counts for each question
     question_ids = [q["id"] for q in questions]
     if question_ids:
         # Get all responses for these questions
-        all_responses = supabase_admin.table("survey_responses").select("question_id").in_("question_id", question_ids).execute()
+        all_responses = await run_query(supabase_admin.table("survey_responses").select("question_id").in_("question_id", question_ids))
         
         # Count responses per question
         response_counts = {}
@@ -327,40 +566,38 @@ async def get_survey_questions(teacher_id: str, class_id: str = None):
         for question in questions:
             question["response_count"] = 0
     
-    return {"questions": questions}
+    _read_cache[cache_key] = questions
+    return etag_json_response(request, {"questions": questions})
 
 
 @router.get("/survey-questions/{question_id}")
 async def get_survey_question_detail(question_id: str):
     """Get survey question details with all responses and student names"""
     try:
-        # Get question details
-        question = supabase_admin.table("survey_questions").select("*").eq("id", question_id).single().execute()
+        # The question and its responses (with each student's name embedded) are
+        # independent lookups, so fetch them concurrently
+        question, responses = await asyncio.gather(
+            run_query(supabase_admin.table("survey_questions").select("*").eq("id", question_id).maybe_single()),
+            run_query(
+                supabase_admin.table("survey_responses")
+                .select("id, student_id, response, lesson_id, created_at, students(name)")
+                .eq("question_id", question_id)
+                .order("created_at", desc=False)
+            ),
+        )
         
-        if not question.data:
+        if not question or not question.data:
             raise HTTPException(status_code=404, detail="Question not found")
         
-        # Get all responses for this question
-        responses = supabase_admin.table("survey_responses").select("*").eq("question_id", question_id).order("created_at", desc=False).execute()
-        
-        # Get student IDs and fetch student names
-        student_ids = [r["student_id"] for r in responses.data or []]
-        students_map = {}
-        
-        if student_ids:
-            students = supabase_admin.table("students").select("id, name").in_("id", student_ids).execute()
-            students_map = {s["id"]: s["name"] for s in students.data or []}
-        
         # Format responses with student names
         formatted_responses = []
         for response in responses.data or []:
-            student_id = response.get("student_id")
-            student_name = students_map.get(student_id, "Unknown Student")
+            student = response.get("students") or {}
             
             formatted_responses.append({
                 "id": response["id"],
-                "student_id": student_id,
-                "student_name": student_name,
+                "student_id": response.get("student_id"),
+                "student_name": student.get("name", "Unknown Student"),
                 "response": response.get("response"),
                 "lesson_id": response.get("lesson_id"),
                 "created_at": response.get("created_at")
@@ -379,111 +616,112 @@ async def get_survey_question_detail(question_id: str):
 
 
 @router.get("/{teacher_id}/schools")
-async def get_teacher_schools(teacher_id: str):
+async def get_teacher_schools(request: Request, teacher_id: str):
     """Get all schools a teacher is associated with, including pending invitations"""
-    from datetime import datetime
-    
-    # Get all teacher_schools relationships for this teacher
-    teacher_schools = supabase_admin.table("teacher_schools").select("*").eq("teacher_id", teacher_id).execute()
-    
-    if not teacher_schools.data:
-        return {"schools": [], "pending_invitations": []}
-    
-    # Get all school IDs
-    school_ids = [ts["school_id"] for ts in teacher_schools.data]
-    
-    # Get school details
-    schools_data = supabase_admin.table("schools").select("*").in_("id", school_ids).execute()
-    
-    # Create a map of school_id -> school data
-    schools_map = {s["id"]: s for s in schools_data.data}
+    # School names and effective invitation status (pending past expiry -> expired)
+    # are resolved by the teacher_schools_status database function
+    result = await run_query(supabase_admin.rpc("teacher_schools_status", {"p_teacher_id": teacher_id}))
     
     schools_list = []
     pending_invitations = []
     
-    for ts in teacher_schools.data:
-        school_id = ts["school_id"]
-        school = schools_map.get(school_id)
-        
-        # Skip if school record doesn't exist
-        if not school:
-            continue
-        
-        invitation_status = ts.get("invitation_status", "pending")
-        invitation_expires_at = ts.get("invitation_expires_at")
-        
+    for ts in result.data or []:
         school_info = {
-            "school_id": school.get("id"),
-            "school_name": school.get("name"),
-            "invitation_status": invitation_status,
-            "invitation_token": ts.get("invitation_token"),
-            "invitation_expires_at": invitation_expires_at,
-            "invitation_sent_at": ts.get("invitation_sent_at")
+            "school_id": ts["school_id"],
+            "school_name": ts["school_name"],
+            "invitation_status": ts["invitation_status"],
+            "invitation_token": ts["invitation_token"],
+            "invitation_expires_at": ts["invitation_expires_at"],
+            "invitation_sent_at": ts["invitation_sent_at"]
         }
         
-        # Check if invitation is expired
-        is_expired = False
-        if invitation_expires_at and invitation_status == "pending":
-            try:
-                expires_at = datetime.fromisoformat(invitation_expires_at.replace("Z", "+00:00"))
-                if datetime.utcnow().replace(tzinfo=expires_at.tzinfo) > expires_at:
-                    is_expired = True
-                    school_info["invitation_status"] = "expired"
-            except:
-                pass
-        
-        if invitation_status == "accepted":
+        if ts["invitation_status"] == "accepted":
             schools_list.append(school_info)
-        elif invitation_status == "pending" and not is_expired:
-            pending_invitations.append(school_info)
-        elif is_expired or invitation_status == "expired":
-            school_info["invitation_status"] = "expired"
+        elif ts["invitation_status"] in ("pending", "expired"):
             pending_invitations.append(school_info)
     
-    return {
+    return etag_json_response(request, {
         "schools": schools_list,
         "pending_invitations": pending_invitations
-    }
+    })
+
+
+async def _get_dashboard_rows(teacher_id: str):
+    """Fetch the teacher's students, survey responses and game sessions as flat lists"""
+    # Classes, their students, and each student's survey responses and game sessions
+    # come back nested in a single request
+    classes = await run_query(
+        supabase.table("classes")
+        .select("id, students(id, survey_responses(*), game_sessions(*))")
+        .eq("teacher_id", teacher_id)
+    )
+    
+    students = []
+    surveys = []
+    games = []
+    for c in classes.data:
+        for student in c.get("students") or []:
+            students.append({"id": student["id"]})
+            surveys.extend(student.get("survey_responses") or [])
+            games.extend(student.get("game_sessions") or [])
+    return students, surveys, games
+
+
+def _dashboard_response(response: dict):
+    """Encode the dashboard payload; row lists are streamed rather than encoded in one piece"""
+    # Rows are plain JSON from Supabase, so both paths skip FastAPI's jsonable_encoder
+    if "student_metrics" in response:
+        return streaming_json_response(response)
+    return ORJSONResponse(response)
 
 
 @router.get("/{teacher_id}/dashboard")
-async def get_teacher_dashboard(teacher_id: str):
+async def get_teacher_dashboard(
+    teacher_id: str,
+    include_rows: bool = Query(True, description="Include raw student, survey response and game session rows"),
+):
     """Get teacher dashboard metrics"""
-    # Get classes
-    classes = supabase.table("classes").select("id, name").eq("teacher_id", teacher_id).execute()
-    
-    # Get students
-    class_ids = [c["id"] for c in classes.data]
-    students = supabase.table("students").select("id").in_("class_id", class_ids).execute()
-    student_ids = [s["id"] for s in students.data]
+    cache_key = (teacher_id, "dashboard", include_rows)
+    response = _read_cache.get(cache_key)
+    if response is not None:
+        return _dashboard_response(response)
     
-    # Get survey responses
-    surveys = supabase.table("survey_responses").select("*").in_("student_id", student_ids).execute()
+    # Counts and averages are computed in Postgres (see migrations/009)
+    metrics_query = run_query(supabase.rpc("teacher_dashboard_metrics", {"p_teacher_id": teacher_id}))
     
-    # Get game sessions
-    games = supabase.table("game_sessions").select("*").in_("student_id", student_ids).execute()
-    
-    # Calculate metrics
-    survey_completion_rate = len(surveys.data) / max(len(students.data), 1) * 100 if students.data else 0
+    if include_rows:
+        metrics_result, (students, surveys, games) = await asyncio.gather(
+            metrics_query, _get_dashboard_rows(teacher_id)
+        )
+    else:
+        metrics_result = await metrics_query
     
-    return {
+    metrics = metrics_result.data[0] if metrics_result.data else {}
+    response = {
         "class_metrics": {
-            "total_classes": len(classes.data),
-            "total_students": len(students.data),
-            "survey_completion_rate": survey_completion_rate,
-            "average_game_score": sum([g.get("score", 0) for g in games.data]) / max(len(games.data), 1) if games.data else 0
-        },
-        "student_metrics": students.data,
-        "survey_responses": surveys.data,
-        "game_sessions": games.data
+            "total_classes": metrics.get("total_classes", 0),
+            "total_students": metrics.get("total_students", 0),
+            "survey_completion_rate": float(metrics.get("survey_completion_rate") or 0),
+            "average_game_score": float(metrics.get("average_game_score") or 0)
+        }
     }
+    
+    if include_rows:
+        response["student_metrics"] = students
+        response["survey_responses"] = surveys
+        response["game_sessions"] = games
+    
+    _read_cache[cache_key] = response
+    return _dashboard_response(response)
 
 
 @router.get("/{teacher_id}/classes")
-async def get_teacher_classes(teacher_id: str):
+async def get_teacher_classes(request: Request, teacher_id: str, fields: Optional[str] = None):
     """Get all classes for a teacher"""
-    classes = supabase.table("classes").select("*").eq("teacher_id", teacher_id).execute()
-    return {"classes": classes.data}
+    columns = _select_columns(fields, CLASS_COLUMNS)
+    query = supabase.table("classes").select(columns).eq("teacher_id", teacher_id)
+    classes = await _cached_query((teacher_id, "classes", columns), query)
+    return etag_json_response(request, {"classes": classes.data})
 
 
 @router.post("/{teacher_id}/classes")
@@ -491,26 +729,26 @@ async def add_teacher_class(teacher_id: str, name: str = Form(...)):
     """Add a new class for this teacher"""
     # Look up teacher's school_id from teacher_schools (get first school they're associated with)
     # Note: For multi-school support, we may need to pass school_id as a parameter
-    teacher_school = supabase_admin.table("teacher_schools").select("school_id").eq("teacher_id", teacher_id).limit(1).single().execute()
-    if not teacher_school.data:
-        raise HTTPException(status_code=404, detail="Teacher not found or not associated with any school")
+    school_id = _teacher_school_cache.get(teacher_id)
+    if school_id is None:
+        teacher_school = await run_query(supabase_admin.table("teacher_schools").select("school_id").eq("teacher_id", teacher_id).limit(1).maybe_single())
+        if not teacher_school or not teacher_school.data:
+            raise HTTPException(status_code=404, detail="Teacher not found or not associated with any school")
+        school_id = _teacher_school_cache[teacher_id] = teacher_school.data["school_id"]
 
     class_data = {
         "name": name,
         "teacher_id": teacher_id,
-        "school_id": teacher_school.data["school_id"],
+        "school_id": school_id,
     }
-    result = supabase_admin.table("classes").insert(class_data).execute()
+    result = await run_query(supabase_admin.table("classes").insert(class_data))
+    _invalidate_read_cache(teacher_id)
     return {"class_id": result.data[0]["id"], "class": result.data[0]}
 
 
 @router.put("/{teacher_id}/classes/{class_id}")
 async def update_teacher_class(teacher_id: str, class_id: str, name: Optional[str] = Form(None)):
     """Update an existing class for this teacher"""
-    class_check = supabase_admin.table("classes").select("teacher_id").eq("id", class_id).single().execute()
-    if not class_check.data or class_check.data["teacher_id"] != teacher_id:
-        raise HTTPException(status_code=404, detail="Class not found")
-
     update_data = {}
     if name is not None:
         update_data["name"] = name
@@ -518,18 +756,22 @@ async def update_teacher_class(teacher_id: str, class_id: str, name: Optional[st
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
 
-    result = supabase_admin.table("classes").update(update_data).eq("id", class_id).execute()
+    # Ownership is part of the WHERE clause; no row back means not found or not owned
+    result = await run_query(supabase_admin.table("classes").update(update_data).eq("id", class_id).eq("teacher_id", teacher_id))
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Class not found")
+    _invalidate_read_cache(teacher_id)
     return {"message": "Class updated", "class": result.data[0]}
 
 
 @router.delete("/{teacher_id}/classes/{class_id}")
 async def delete_teacher_class(teacher_id: str, class_id: str):
     """Delete a class owned by this teacher"""
-    class_check = supabase_admin.table("classes").select("teacher_id").eq("id", class_id).single().execute()
-    if not class_check.data or class_check.data["teacher_id"] != teacher_id:
+    # Ownership is part of the WHERE clause; no row back means not found or not owned
+    result = await run_query(supabase_admin.table("classes").delete().eq("id", class_id).eq("teacher_id", teacher_id))
+    if not result.data:
         raise HTTPException(status_code=404, detail="Class not found")
-
-    supabase_admin.table("classes").delete().eq("id", class_id).execute()
+    _invalidate_read_cache(teacher_id)
     return {"message": "Class deleted"}
 
 
@@ -1,53 +1,74 @@
-from fastapi import APIRouter
-from app.database import supabase
+import uuid
+from types import MappingProxyType
+from cachetools import TTLCache
+from fastapi import APIRouter, Request
+from app.database import supabase, run_query
+from app.responses import etag_json_response
 
 router = APIRouter()
 
+# Colors used when a school has no theme row (or no real school_id yet).
+# Read-only so the shared mapping cannot be changed by a caller.
+DEFAULT_THEME_COLORS = MappingProxyType({
+    "primary_color": "#3B82F6",
+    "secondary_color": "#10B981",
+    "accent_color": "#F59E0B",
+})
+
+
+# Themes change rarely but are read on every page load, so resolved themes
+# (including the default fallback) are kept per process for a few minutes.
+# update_theme calls forget_theme so a school sees its own change immediately.
+THEME_CACHE_TTL_SECONDS = 300
+_theme_cache: TTLCache = TTLCache(maxsize=2048, ttl=THEME_CACHE_TTL_SECONDS)
+
+
+def default_theme(school_id: str) -> dict:
+    """Default theme payload for a school"""
+    return {"school_id": school_id, **DEFAULT_THEME_COLORS}
+
+
+def forget_theme(school_id: str) -> None:
+    """Drop a school's cached theme (call after the theme is created or updated)"""
+    _theme_cache.pop(school_id, None)
+
 
 @router.get("/{school_id}")
-async def get_theme(school_id: str):
+async def get_theme(request: Request, school_id: str):
     """Get theme configuration for a school.
 
     If the school_id is a placeholder (e.g. 'default') or invalid for the
     UUID column in the database, return a safe default theme instead of
     letting the database raise a 22P02 error.
+
+    Responses carry an ETag, so a client polling an unchanged theme gets a 304.
     """
 
-    # Handle placeholder / non-UUID IDs gracefully
+    # Handle placeholder / non-UUID IDs gracefully, without a database round trip.
     # Some frontend code uses 'default' when there is no real school_id yet.
-    if school_id == "default":
-        return {
-            "school_id": school_id,
-            "primary_color": "#3B82F6",
-            "secondary_color": "#10B981",
-            "accent_color": "#F59E0B",
-        }
+    try:
+        uuid.UUID(school_id)
+    except ValueError:
+        return etag_json_response(request, default_theme(school_id))
+
+    cached = _theme_cache.get(school_id)
+    if cached is not None:
+        return etag_json_response(request, cached)
 
     try:
-        theme = (
+        theme = await run_query(
             supabase.table("themes")
             .select("*")
             .eq("school_id", school_id)
-            .single()
-            .execute()
+            .maybe_single()
         )
     except Exception:
-        # If Supabase/Postgres rejects the ID (e.g. invalid UUID syntax),
-        # fall back to a default theme instead of crashing the request.
-        return {
-            "school_id": school_id,
-            "primary_color": "#3B82F6",
-            "secondary_color": "#10B981",
-            "accent_color": "#F59E0B",
-        }
-
-    if not theme.data:
-        return {
-            "school_id": school_id,
-            "primary_color": "#3B82F6",
-            "secondary_color": "#10B981",
-            "accent_color": "#F59E0B",
-        }
-
-    return theme.data
+        # If the lookup fails, fall back to a default theme instead of crashing
+        # the request. Not cached, so a transient error does not pin the default theme.
+        return etag_json_response(request, default_theme(school_id))
+
+    # maybe_single() returns None when the school has no theme row
+    result = theme.data if theme and theme.data else default_theme(school_id)
+    _theme_cache[school_id] = result
+    return etag_json_response(request, result)
 
@@ -14,10 +14,20 @@ Setup instructions for Resend:
 3. Add RESEND_API_KEY to your .env file
 4. Verify your domain (or use Resend's test domain for development)
 """
+import asyncio
+import logging
 import os
-from typing import Optional
+import random
+import time
+import uuid
+import httpx
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+from jinja2 import DictLoader, Environment, FileSystemBytecodeCache, select_autoescape
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 # Load environment variables from .env file if python-dotenv is available
 try:
     from dotenv import load_dotenv
@@ -30,9 +40,290 @@ try:
     RESEND_AVAILABLE = True
 except ImportError:
     RESEND_AVAILABLE = False
-    print("Warning: resend package not installed. Email functionality will be disabled.")
+    logger.warning("resend package not installed. Email functionality will be disabled.")
+
+# Pluggable HTTP clients (resend.http_client / resend.default_http_client) need a recent SDK;
+# an older one still sends, but without the pooled connections below
+try:
+    from resend.http_client import HTTPClient as ResendHTTPClient
+    RESEND_POOLING_AVAILABLE = True
+except ImportError:
+    ResendHTTPClient = object
+    RESEND_POOLING_AVAILABLE = False
+    if RESEND_AVAILABLE:
+        logger.warning(
+            f"resend {getattr(resend, '__version__', '(unknown version)')} does not support custom HTTP clients; "
+            "upgrade to the version in requirements.txt"
+        )
+
+# The resend SDK's default client calls requests.request() per email, opening a
+# new connection (and TLS handshake) each time. Sends go through this pooled
+# client instead; it is shared by all sending threads and closed from the app lifespan.
+_resend_http_client = httpx.Client(
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+    http2=True,
+    timeout=30,
+)
+
+
+class PooledResendHTTPClient(ResendHTTPClient):
+    """resend SDK HTTP client backed by the shared pooled httpx client"""
+    
+    def request(self, method, url, headers, json=None, files=None, data=None):
+        try:
+            resp = _resend_http_client.request(
+                method,
+                url,
+                headers=headers,
+                json=json if data is None and files is None else None,
+                data=data,
+                files=files,
+            )
+        except httpx.HTTPError as e:
+            # Wrapped into a retryable ResendError (code 500) by the SDK, as with its default client
+            raise RuntimeError(f"Request failed: {e}") from e
+        return resp.content, resp.status_code, resp.headers
+
+
+def close_email_http_client():
+    """Close the pooled connections to Resend"""
+    _resend_http_client.close()
+
+_TEACHER_INVITATION_HTML_SOURCE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+        .header { background-color: #3B82F6; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }
+        .content { background-color: #f9fafb; padding: 30px; border-radius: 0 0 8px 8px; }
+        .button { display: inline-block; background-color: #3B82F6; color: white; padding: 12px 24px; text-decoration: none; border-radius: 8px; margin: 20px 0; }
+        .button:hover { background-color: #2563EB; }
+        .footer { text-align: center; margin-top: 20px; color: #6b7280; font-size: 12px; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>EigoKit Teacher Invitation</h1>
+        </div>
+        <div class="content">
+            <p>Hello {{ name }},</p>
+            <p>You have been invited{{ inviter_text }} to join <strong>{{ school_name }}</strong> as a teacher on EigoKit.</p>
+            <p>EigoKit is an English learning platform that helps you manage your students, track their progress, and deliver engaging lessons.</p>
+            <p style="text-align: center;">
+                <a href="{{ invitation_url }}" class="button">Accept Invitation</a>
+            </p>
+            <p>Or copy and paste this link into your browser:</p>
+            <p style="word-break: break-all; color: #6b7280; font-size: 14px;">{{ invitation_url }}</p>
+            <p>This invitation link will expire in 7 days.</p>
+            <p>If you didn't expect this invitation, you can safely ignore this email.</p>
+        </div>
+        <div class="footer">
+            <p>© EigoKit - English Learning Platform</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+_TEACHER_INVITATION_TEXT_SOURCE = """Hello {{ name }},
+
+You have been invited{{ inviter_text }} to join {{ school_name }} as a teacher on EigoKit.
+
+EigoKit is an English learning platform that helps you manage your students, track their progress, and deliver engaging lessons.
+
+Accept your invitation by clicking this link:
+{{ invitation_url }}
+
+This invitation link will expire in 7 days.
+
+If you didn't expect this invitation, you can safely ignore this email.
+
+© EigoKit - English Learning Platform
+"""
+
+_SCHOOL_ADMIN_INVITATION_HTML_SOURCE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+        .container { max-width: 600px; margin: 0 auto; padding: 20px; }
+        .header { background: #3B82F6; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }
+        .content { background: #f9fafb; padding: 30px; border-radius: 0 0 8px 8px; }
+        .button { display: inline-block; padding: 12px 24px; background: #3B82F6; color: white; text-decoration: none; border-radius: 6px; margin: 20px 0; }
+        .footer { text-align: center; margin-top: 20px; color: #6b7280; font-size: 12px; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>EigoKit School Admin Invitation</h1>
+        </div>
+        <div class="content">
+            <p>Hello {{ name }},</p>
+            <p>You have been invited{{ inviter_text }} to administer <strong>{{ school_name }}</strong> on EigoKit.</p>
+            <p>EigoKit is an English learning platform that helps schools manage students, teachers, and classes.</p>
+            <p style="text-align: center;">
+                <a href="{{ invitation_url }}" class="button">Accept Invitation</a>
+            </p>
+            <p>Or copy and paste this link into your browser:</p>
+            <p style="word-break: break-all; color: #6b7280; font-size: 14px;">{{ invitation_url }}</p>
+            <p>This invitation link will expire in 7 days.</p>
+            <p>If you didn't expect this invitation, you can safely ignore this email.</p>
+        </div>
+        <div class="footer">
+            <p>© EigoKit - English Learning Platform</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+_SCHOOL_ADMIN_INVITATION_TEXT_SOURCE = """Hello {{ name }},
+
+You have been invited{{ inviter_text }} to administer {{ school_name }} on EigoKit.
+
+EigoKit is an English learning platform that helps schools manage students, teachers, and classes.
+
+Accept your invitation by clicking this link:
+{{ invitation_url }}
+
+This invitation link will expire in 7 days.
+
+If you didn't expect this invitation, you can safely ignore this email.
+
+© EigoKit - English Learning Platform
+"""
+
+
+def _template_bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    """Bytecode cache in the per-user temp directory, or None if it cannot be created"""
+    try:
+        return FileSystemBytecodeCache()
+    except (OSError, RuntimeError) as e:
+        logger.warning(f"Email template bytecode cache disabled: {str(e)}")
+        return None
+
+
+# Email templates are compiled once at import time; sending only renders them.
+# .html templates are autoescaped, .txt templates are not. Compiled bytecode is
+# also kept on disk, so a freshly started worker skips parsing the templates.
+_template_env = Environment(
+    loader=DictLoader({
+        "teacher_invitation.html": _TEACHER_INVITATION_HTML_SOURCE,
+        "teacher_invitation.txt": _TEACHER_INVITATION_TEXT_SOURCE,
+        "school_admin_invitation.html": _SCHOOL_ADMIN_INVITATION_HTML_SOURCE,
+        "school_admin_invitation.txt": _SCHOOL_ADMIN_INVITATION_TEXT_SOURCE,
+    }),
+    autoescape=select_autoescape(["html"]),
+    bytecode_cache=_template_bytecode_cache(),
+)
+TEACHER_INVITATION_HTML = _template_env.get_template("teacher_invitation.html")
+TEACHER_INVITATION_TEXT = _template_env.get_template("teacher_invitation.txt")
+SCHOOL_ADMIN_INVITATION_HTML = _template_env.get_template("school_admin_invitation.html")
+SCHOOL_ADMIN_INVITATION_TEXT = _template_env.get_template("school_admin_invitation.txt")
+
+
+# Resend accepts at most this many emails per batch request; larger lists are sent in chunks
+MAX_BATCH_EMAILS = 100
+
+# Rate limiting (429), server errors and network failures are retried with
+# exponential backoff plus jitter; other errors (auth, validation) fail at once.
+SEND_MAX_ATTEMPTS = 4
+SEND_RETRY_BASE_DELAY = 0.5  # seconds
+SEND_RETRY_MAX_DELAY = 8  # seconds
+_RETRYABLE_STATUS_CODES = {"429", "500", "502", "503", "504"}
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Whether a failed send is worth retrying"""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    # Daily/monthly quota errors are also 429s but will not clear within a retry window
+    if str(getattr(error, "error_type", "")).endswith("quota_exceeded"):
+        return False
+    return str(getattr(error, "code", "")) in _RETRYABLE_STATUS_CODES
+
+
+def _send_with_retries(send: Callable, params, options: Optional[Dict] = None):
+    """
+    Call a Resend send function, retrying transient failures.
+    
+    Every attempt carries the same idempotency key, so a retry after a request
+    that did reach Resend does not deliver the email twice.
+    """
+    options = {**(options or {}), "idempotency_key": str(uuid.uuid4())}
+    for attempt in range(SEND_MAX_ATTEMPTS):
+        try:
+            return send(params, options)
+        except Exception as e:
+            if attempt == SEND_MAX_ATTEMPTS - 1 or not _is_retryable(e):
+                raise
+            delay = min(SEND_RETRY_MAX_DELAY, SEND_RETRY_BASE_DELAY * 2 ** attempt)
+            delay += random.uniform(0, SEND_RETRY_BASE_DELAY)
+            logger.warning(f"Email send failed ({str(e)}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+# Emails whose outcome the request does not report (e.g. a new teacher's
+# invitation) are sent by background workers started from the app lifespan, so
+# the request does not wait on Resend. The worker count also caps concurrent
+# sends, and the bounded queue makes callers wait when sending falls behind.
+EMAIL_QUEUE_SIZE = 100
+EMAIL_WORKERS = 5
+_email_queue: Optional[asyncio.Queue] = None
+_email_workers: List[asyncio.Task] = []
+
+
+async def _send_queued_emails(queue: asyncio.Queue):
+    """Send queued emails one at a time until a None item arrives"""
+    while True:
+        item = await queue.get()
+        if item is None:
+            return
+        send, args, kwargs = item
+        try:
+            if await asyncio.to_thread(send, *args, **kwargs) is False:
+                logger.warning(f"Queued email was not sent ({send.__name__})")
+        except Exception as e:
+            logger.error(f"Error sending queued email ({send.__name__}): {str(e)}")
+
+
+def start_email_workers():
+    """Start the background tasks that send queued emails"""
+    global _email_queue, _email_workers
+    _email_queue = asyncio.Queue(maxsize=EMAIL_QUEUE_SIZE)
+    _email_workers = [asyncio.create_task(_send_queued_emails(_email_queue)) for _ in range(EMAIL_WORKERS)]
+
+
+async def stop_email_workers():
+    """Send any queued emails and stop the background workers"""
+    global _email_queue, _email_workers
+    queue, workers = _email_queue, _email_workers
+    # New emails are sent inline from here on
+    _email_queue = None
+    _email_workers = []
+    if queue is not None:
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
 
 
+async def enqueue_email(send: Callable, *args, **kwargs) -> None:
+    """
+    Call send(*args, **kwargs) (e.g. email_service.send_teacher_invitation) in the background.
+    
+    If the workers are not running, the email is sent before returning and
+    send's exceptions propagate to the caller.
+    """
+    if _email_queue is None:
+        await asyncio.to_thread(send, *args, **kwargs)
+        return
+    await _email_queue.put((send, args, kwargs))
+
 class EmailService:
     """Email service for sending notifications"""
     
@@ -50,32 +341,54 @@ class EmailService:
             os.getenv("resend_from_email") or
             "onboarding@resend.dev"
         )
+        # Frontend URLs do not change while the process runs, so resolve them once
+        self._role_urls: Dict[str, Optional[str]] = {}
+        for role in ("teacher", "school_admin", "platform_admin"):
+            url = self._resolve_frontend_url(role)
+            self._role_urls[role] = url.rstrip('/') if url else None
+        teacher_url = self._role_urls["teacher"]
+        self._teacher_invitation_url_prefix = (
+            f"{teacher_url}/teacher/accept-invitation?token=" if teacher_url else None
+        )
         # Debug output
         if not RESEND_AVAILABLE:
-            print("Warning: resend package not installed. Run: pip install resend")
+            logger.warning("resend package not installed. Run: pip install resend")
         elif not self.resend_api_key:
-            print("Warning: Email service not configured. Set RESEND_API_KEY in .env to enable emails.")
-            print(f"Debug: settings.resend_api_key = {getattr(settings, 'resend_api_key', None)}")
-            print(f"Debug: os.getenv('RESEND_API_KEY') = {os.getenv('RESEND_API_KEY')}")
+            logger.warning("Email service not configured. Set RESEND_API_KEY in .env to enable emails.")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"settings.resend_api_key = {getattr(settings, 'resend_api_key', None)}")
+                logger.debug(f"os.getenv('RESEND_API_KEY') = {os.getenv('RESEND_API_KEY')}")
         else:
             # Only print success message if key is set (to avoid cluttering logs)
             if self.resend_api_key:
-                print(f"Email service configured. From: {self.from_email}")
+                logger.info(f"Email service configured. From: {self.from_email}")
         
         if RESEND_AVAILABLE and self.resend_api_key:
             try:
                 # New resend SDK (v2.x) uses module-level API key
                 resend.api_key = self.resend_api_key
+                if RESEND_POOLING_AVAILABLE:
+                    resend.default_http_client = PooledResendHTTPClient()
                 self.resend = resend  # Store the module reference
+                # Emails is stateless (the API key is module-level), so one instance serves every send
+                self._emails_api = resend.Emails()
             except Exception as e:
-                print(f"Error initializing Resend client: {str(e)}")
+                logger.error(f"Error initializing Resend client: {str(e)}")
                 self.resend = None
+                self._emails_api = None
         else:
             self.resend = None
+            self._emails_api = None
     
-    def _get_frontend_url_for_role(self, role: str, inviter_role: Optional[str] = None) -> Optional[str]:
+    def send_email(self, params: dict):
+        """Send one email (Resend params dict) through the shared Emails client, retrying transient failures"""
+        return _send_with_retries(self._emails_api.send, params)
+    
+    @staticmethod
+    def _resolve_frontend_url(role: str) -> Optional[str]:
         """
-        Get the frontend base URL for a given role based on invitation routing rules.
+        Read the frontend base URL for a given role from settings or the environment,
+        following the invitation routing rules.
         
         Routing rules:
         - Teachers: Always use FRONTEND_TEACHERS_URL (regardless of who invites them)
@@ -87,7 +400,6 @@ class EmailService:
         
         Args:
             role: The role being invited ('teacher', 'school_admin', 'platform_admin')
-            inviter_role: The role of the person sending the invitation (optional, for future use)
         
         Returns:
             The frontend base URL for the role, or None if not configured
@@ -115,6 +427,68 @@ class EmailService:
             )
         return None
     
+    def _get_frontend_url_for_role(self, role: str, inviter_role: Optional[str] = None) -> Optional[str]:
+        """
+        Get the frontend base URL (without a trailing slash) for a given role.
+        
+        Args:
+            role: The role being invited ('teacher', 'school_admin', 'platform_admin')
+            inviter_role: The role of the person sending the invitation (optional, for future use)
+        
+        Returns:
+            The frontend base URL for the role, or None if not configured
+        """
+        return self._role_urls.get(role)
+    
+    @staticmethod
+    def _teacher_invitation_fragments(school_name: str, inviter_name: Optional[str]) -> Dict[str, str]:
+        """Subject and template values shared by every invitation from one inviter to one school"""
+        return {
+            "subject": f"Invitation to join {school_name} on EigoKit",
+            "inviter_text": f" by {inviter_name}" if inviter_name else "",
+            "school_name": school_name,
+        }
+    
+    def _teacher_invitation_params(
+        self,
+        teacher_email: str,
+        teacher_name: str,
+        school_name: str,
+        invitation_token: str,
+        inviter_name: Optional[str] = None,
+        fragments: Optional[Dict[str, str]] = None
+    ) -> Optional[Dict]:
+        """
+        Build the Resend params for a teacher invitation, or None if the teacher frontend URL is not configured.
+        
+        fragments may carry _teacher_invitation_fragments(school_name, inviter_name)
+        computed once for several invitations.
+        """
+        # Teachers are always invited to the teacher frontend
+        if not self._teacher_invitation_url_prefix:
+            logger.warning(f"FRONTEND_TEACHERS_URL not configured. Cannot send invitation to {teacher_email}")
+            return None
+        
+        # Build invitation URL using the teacher frontend URL (token percent-encoded)
+        invitation_url = self._teacher_invitation_url_prefix + quote(invitation_token, safe="")
+        
+        # Email content
+        if fragments is None:
+            fragments = self._teacher_invitation_fragments(school_name, inviter_name)
+        template_vars = {
+            "name": teacher_name,
+            "inviter_text": fragments["inviter_text"],
+            "school_name": fragments["school_name"],
+            "invitation_url": invitation_url,
+        }
+        return {
+            "from": self.from_email,
+            "to": [teacher_email],
+            "subject": fragments["subject"],
+            "html": TEACHER_INVITATION_HTML.render(template_vars),
+            "text": TEACHER_INVITATION_TEXT.render(template_vars),
+        }
+    
     def send_teacher_invitation(
         self,
         teacher_email: str,
@@ -138,99 +512,84 @@ class EmailService:
             True if email was sent successfully, False otherwise
         """
         if not self.resend:
-            print(f"Email service not available. Would send invitation to {teacher_email}")
+            logger.info(f"Email service not available. Would send invitation to {teacher_email}")
             return False
         
-        # Teachers are always invited to the teacher frontend
-        frontend_url = self._get_frontend_url_for_role("teacher")
-        if not frontend_url:
-            print(f"Warning: FRONTEND_TEACHERS_URL not configured. Cannot send invitation to {teacher_email}")
+        params = self._teacher_invitation_params(
+            teacher_email, teacher_name, school_name, invitation_token, inviter_name
+        )
+        if not params:
             return False
         
-        # Build invitation URL using the teacher frontend URL
-        base_url = frontend_url.rstrip('/')
-        invitation_url = f"{base_url}/teacher/accept-invitation?token={invitation_token}"
-        
-        # Email content
-        inviter_text = f" by {inviter_name}" if inviter_name else ""
-        subject = f"Invitation to join {school_name} on EigoKit"
-        
-        html_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background-color: #3B82F6; color: white; padding: 20px; text-align: center; border-radius: 8px 8px 0 0; }}
-                .content {{ background-color: #f9fafb; padding: 30px; border-radius: 0 0 8px 8px; }}
-                .button {{ display: inline-block; background-color: #3B82F6; color: white; padding: 12px 24px; text-decoration: none; border-radius: 8px; margin: 20px 0; }}
-                .button:hover {{ background-color: #2563EB; }}
-                .footer {{ text-align: center; margin-top: 20px; color: #6b7280; font-size: 12px; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>EigoKit Teacher Invitation</h1>
-                </div>
-                <div class="content">
-                    <p>Hello {teacher_name},</p>
-                    <p>You have been invited{inviter_text} to join <strong>{school_name}</strong> as a teacher on EigoKit.</p>
-                    <p>EigoKit is an English learning platform that helps you manage your students, track their progress, and deliver engaging lessons.</p>
-                    <p style="text-align: center;">
-                        <a href="{invitation_url}" class="button">Accept Invitation</a>
-                    </p>
-                    <p>Or copy and paste this link into your browser:</p>
-                    <p style="word-break: break-all; color: #6b7280; font-size: 14px;">{invitation_url}</p>
-                    <p>This invitation link will expire in 7 days.</p>
-                    <p>If you didn't expect this invitation, you can safely ignore this email.</p>
-                </div>
-                <div class="footer">
-                    <p>© EigoKit - English Learning Platform</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        text_content = f"""
-        Hello {teacher_name},
-        
-        You have been invited{inviter_text} to join {school_name} as a teacher on EigoKit.
-        
-        EigoKit is an English learning platform that helps you manage your students, track their progress, and deliver engaging lessons.
-        
-        Accept your invitation by clicking this link:
-        {invitation_url}
-        
-        This invitation link will expire in 7 days.
-        
-        If you didn't expect this invitation, you can safely ignore this email.
-        
-        © EigoKit - English Learning Platform
-        """
-        
         try:
-            # New resend SDK (v2.x) API - use Emails class
-            emails = self.resend.Emails()
-            params = {
-                "from": self.from_email,
-                "to": [teacher_email],
-                "subject": subject,
-                "html": html_content,
-                "text": text_content,
-            }
-            
-            email = emails.send(params)
-            print(f"Teacher invitation email sent to {teacher_email}: {email}")
+            email = self.send_email(params)
+            logger.info(f"Teacher invitation email sent to {teacher_email}: {email}")
             return True
         except Exception as e:
             error_msg = str(e)
-            print(f"Failed to send email to {teacher_email}: {error_msg}")
+            logger.error(f"Failed to send email to {teacher_email}: {error_msg}")
             # Re-raise to provide more context to the caller
             raise Exception(f"Email send failed: {error_msg}")
+    
+    def send_teacher_invitations_bulk(self, invitations: List[Dict]) -> List[Tuple[str, bool, Optional[str]]]:
+        """
+        Send several teacher invitations with one Resend batch request per
+        MAX_BATCH_EMAILS recipients.
+        
+        Args:
+            invitations: Dicts with the send_teacher_invitation arguments
+                (teacher_email, teacher_name, school_name, invitation_token,
+                and optionally inviter_name)
+        
+        Returns:
+            One (teacher_email, sent, error) tuple per invitation, in order.
+            error is None when the invitation was handed to Resend.
+        """
+        emails = [invitation["teacher_email"] for invitation in invitations]
+        if not self.resend:
+            for email in emails:
+                logger.info(f"Email service not available. Would send invitation to {email}")
+            return [(email, False, "Email service not configured") for email in emails]
+        
+        errors: List[Optional[str]] = [None] * len(invitations)
+        pending = []  # (index into invitations, params)
+        # Invitations in one bulk request usually share the school and inviter
+        shared_fragments: Dict[tuple, Dict[str, str]] = {}
+        for index, invitation in enumerate(invitations):
+            key = (invitation["school_name"], invitation.get("inviter_name"))
+            fragments = shared_fragments.get(key)
+            if fragments is None:
+                fragments = shared_fragments[key] = self._teacher_invitation_fragments(*key)
+            params = self._teacher_invitation_params(**invitation, fragments=fragments)
+            if params:
+                pending.append((index, params))
+            else:
+                errors[index] = "Teacher frontend URL not configured"
+        
+        for start in range(0, len(pending), MAX_BATCH_EMAILS):
+            chunk = pending[start:start + MAX_BATCH_EMAILS]
+            try:
+                if len(chunk) == 1:
+                    self.send_email(chunk[0][1])
+                    rejected = []
+                else:
+                    # Permissive mode sends the valid emails and reports the invalid ones by position
+                    response = _send_with_retries(
+                        self.resend.Batch.send,
+                        [params for _, params in chunk],
+                        {"batch_validation": "permissive"},
+                    )
+                    rejected = response.get("errors") or []
+            except Exception as e:
+                logger.error(f"Failed to send teacher invitation batch: {str(e)}")
+                for index, _ in chunk:
+                    errors[index] = f"Email send failed: {str(e)}"
+                continue
+            for rejection in rejected:
+                errors[chunk[rejection["index"]][0]] = rejection.get("message") or "Rejected by email service"
+            logger.info(f"Teacher invitation emails sent to {len(chunk) - len(rejected)} of {len(chunk)} recipients")
+        
+        return [(email, error is None, error) for email, error in zip(emails, errors)]
 
 
 # Global email service instance
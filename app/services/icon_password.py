@@ -7,14 +7,34 @@ This module handles the icon-based password system for students:
 - Each student gets a unique 5-icon sequence from their school's 9 icons
 """
 
-import random
-from typing import List, Set, Optional
+import secrets
+import threading
+from itertools import permutations
+from types import MappingProxyType
+from typing import Callable, List, Set, Optional, Tuple
 import logging
+from cachetools import TTLCache
 
 logger = logging.getLogger(__name__)
 
-# All 48 available icons (expanded from 24)
-ALL_ICONS = [
+# Used icon sequences per school, loaded from the database when a school needs a
+# new sequence and kept up to date as sequences are handed out, so adding a
+# student does not re-read every student's sequence in the school. Entries expire
+# after USED_SEQUENCES_TTL_SECONDS so sequences assigned by other workers (or
+# freed by deleted students) are picked up.
+# The lock makes "pick an unused sequence and mark it used" atomic across threads
+# and guards the cache itself, which is not thread-safe.
+USED_SEQUENCES_TTL_SECONDS = 60
+_used_sequences_cache: TTLCache = TTLCache(maxsize=1024, ttl=USED_SEQUENCES_TTL_SECONDS)
+_used_sequences_lock = threading.Lock()
+
+# School password icons and student icon sequences are credentials, so they are
+# drawn from the OS CSPRNG. SystemRandom keeps no shared state, so concurrent
+# threads do not contend on a generator.
+_secure_random = secrets.SystemRandom()
+
+# All 48 available icons (expanded from 24). Read-only reference data, so a tuple.
+ALL_ICONS = (
     {'id': 1, 'name': 'apple', 'emoji': '🍎'},
     {'id': 2, 'name': 'banana', 'emoji': '🍌'},
     {'id': 3, 'name': 'orange', 'emoji': '🍊'},
@@ -63,13 +83,13 @@ ALL_ICONS = [
     {'id': 46, 'name': 'snail', 'emoji': '🐌'},
     {'id': 47, 'name': 'crab', 'emoji': '🦀'},
     {'id': 48, 'name': 'lobster', 'emoji': '🦞'},
-]
+)
 
-# Icon lookup by ID
-ICON_BY_ID = {icon['id']: icon for icon in ALL_ICONS}
+# Read-only icon lookup by ID (values are the same dicts as in ALL_ICONS)
+ICON_BY_ID = MappingProxyType({icon['id']: icon for icon in ALL_ICONS})
 
 
-def get_all_icons() -> List[dict]:
+def get_all_icons() -> Tuple[dict, ...]:
     """Get all available icons"""
     return ALL_ICONS
 
@@ -80,8 +100,25 @@ def get_icon_by_id(icon_id: int) -> Optional[dict]:
 
 
 def get_icons_by_ids(icon_ids: List[int]) -> List[dict]:
-    """Get multiple icons by their IDs"""
-    return [ICON_BY_ID.get(id) for id in icon_ids if ICON_BY_ID.get(id)]
+    """Get multiple icons by their IDs (unknown IDs are skipped)"""
+    get = ICON_BY_ID.get
+    return [icon for icon_id in icon_ids if (icon := get(icon_id)) is not None]
+
+
+# Longest accepted comma-separated icon sequence text (5 ids plus separators and spaces)
+MAX_ICON_SEQUENCE_TEXT_LENGTH = 64
+
+
+def parse_icon_sequence(text: str) -> List[int]:
+    """
+    Parse a comma-separated icon sequence such as "3, 14, 7, 22, 9".
+    
+    Raises ValueError if the text is too long or an item is not an integer.
+    """
+    if len(text) > MAX_ICON_SEQUENCE_TEXT_LENGTH:
+        raise ValueError(f"icon sequence longer than {MAX_ICON_SEQUENCE_TEXT_LENGTH} characters")
+    # int() ignores surrounding whitespace, so items need no separate strip()
+    return list(map(int, text.split(",")))
 
 
 def generate_school_password_icons() -> List[int]:
@@ -90,42 +127,46 @@ def generate_school_password_icons() -> List[int]:
     Returns a list of 9 unique icon IDs.
     """
     available_ids = list(range(1, 49))  # IDs 1-48
-    selected = random.sample(available_ids, 9)
+    selected = _secure_random.sample(available_ids, 9)
     return sorted(selected)
 
 
 def generate_unique_icon_sequence(
     school_password_icons: List[int],
     used_sequences: Set[tuple],
-    max_attempts: int = 1000
+    max_attempts: int = 16
 ) -> Optional[List[int]]:
     """
     Generate a unique 5-icon sequence from a school's 9 password icons.
     
+    A few random draws are tried first, which almost always succeed while the
+    school has few students. After that every unused ordered sequence is listed
+    (at most 9*8*7*6*5 = 15120) and one is chosen at random, so the result is
+    unique whenever one exists.
+    
     Args:
         school_password_icons: List of 9 icon IDs available for the school
         used_sequences: Set of tuples representing already-used sequences
-        max_attempts: Maximum number of attempts to find a unique sequence
+        max_attempts: Number of random draws before falling back to enumeration
     
     Returns:
-        List of 5 icon IDs in order, or None if no unique sequence found
+        List of 5 icon IDs in order, or None if every sequence is already used
     """
     if len(school_password_icons) < 5:
         logger.error(f"School has fewer than 5 password icons: {len(school_password_icons)}")
         return None
     
     for _ in range(max_attempts):
-        # Generate a random 5-icon sequence from the school's 9 icons
-        # Order matters, so we use random.sample (no replacement) then shuffle
-        sequence = random.sample(school_password_icons, 5)
-        seq_tuple = tuple(sequence)
-        
-        if seq_tuple not in used_sequences:
+        # Order matters, so sample (no replacement) gives an ordered sequence
+        sequence = _secure_random.sample(school_password_icons, 5)
+        if tuple(sequence) not in used_sequences:
             return sequence
     
-    logger.warning(f"Could not generate unique sequence after {max_attempts} attempts")
-    # Return a random one anyway (shouldn't happen in practice with 9 choose 5 = 126 combinations)
-    return random.sample(school_password_icons, 5)
+    remaining = [seq for seq in permutations(school_password_icons, 5) if seq not in used_sequences]
+    if not remaining:
+        logger.warning(f"All {len(used_sequences)} icon sequences for these password icons are in use")
+        return None
+    return list(_secure_random.choice(remaining))
 
 
 def get_used_sequences_for_school(
@@ -144,35 +185,134 @@ def get_used_sequences_for_school(
     Returns:
         Set of tuples representing used sequences
     """
+    try:
+        return _fetch_used_sequences(supabase_admin, school_id, student_id=student_id)
+    except Exception as e:
+        logger.error(f"Error getting used sequences for school {school_id}: {str(e)}")
+        return set()
+
+
+def _fetch_used_sequences(
+    supabase_admin,
+    school_id: str,
+    student_id: Optional[str] = None
+) -> Set[tuple]:
+    """Query the used icon sequences for a school (raises on database errors)"""
     used_sequences = set()
     
-    try:
-        # Get all classes for the school
-        classes = supabase_admin.table("classes").select("id").eq("school_id", school_id).execute()
-        class_ids = [c["id"] for c in classes.data] if classes.data else []
-        
-        if not class_ids:
-            return used_sequences
-        
-        # Get all students in those classes
-        query = supabase_admin.table("students").select("id, icon_sequence").in_("class_id", class_ids)
-        
-        if student_id:
-            query = query.neq("id", student_id)
-        
-        students = query.execute()
-        
-        # Extract sequences
-        for student in students.data or []:
-            icon_seq = student.get("icon_sequence")
-            if icon_seq and isinstance(icon_seq, list) and len(icon_seq) == 5:
-                # Convert to tuple for set membership
-                used_sequences.add(tuple(icon_seq))
+    # Students of every class in the school, filtered through the inner join
+    # to classes in a single round trip
+    query = (
+        supabase_admin.table("students")
+        .select("icon_sequence, classes!inner(school_id)")
+        .eq("classes.school_id", school_id)
+    )
+    
+    if student_id:
+        query = query.neq("id", student_id)
+    
+    students = query.execute()
+    
+    # Extract sequences
+    for student in students.data or []:
+        icon_seq = student.get("icon_sequence")
+        if icon_seq and isinstance(icon_seq, list) and len(icon_seq) == 5:
+            # Convert to tuple for set membership
+            used_sequences.add(tuple(icon_seq))
     
+    return used_sequences
+
+
+def _get_cached_used_sequences(supabase_admin, school_id: str) -> Set[tuple]:
+    """
+    Get the cached set of used sequences for a school, loading it when missing or expired.
+    
+    The returned set is shared; mutate it only while holding _used_sequences_lock.
+    If the database load fails, an uncached empty set is returned so the next
+    call retries the load.
+    """
+    with _used_sequences_lock:
+        used_sequences = _used_sequences_cache.get(school_id)
+    if used_sequences is not None:
+        return used_sequences
+    
+    try:
+        loaded = _fetch_used_sequences(supabase_admin, school_id)
     except Exception as e:
         logger.error(f"Error getting used sequences for school {school_id}: {str(e)}")
+        return set()
     
-    return used_sequences
+    with _used_sequences_lock:
+        return _used_sequences_cache.setdefault(school_id, loaded)
+
+
+def _fetch_school_password_icons(supabase_admin, school_id: str) -> Optional[dict]:
+    """Query a school's password icons (raises on database errors)"""
+    try:
+        school = supabase_admin.table("schools").select("password_icons").eq("id", school_id).single().execute()
+    except Exception as e:
+        # Check if the error is about missing column
+        error_msg = str(e).lower()
+        if "password_icons" in error_msg and ("does not exist" in error_msg or "column" in error_msg):
+            logger.error(f"password_icons column does not exist. Please run migration: migrations/002_add_school_password_icons.sql")
+            raise Exception("Database migration required: password_icons column missing. Please run migrations/002_add_school_password_icons.sql")
+        raise
+    return school.data
+
+
+def _load_school_icon_state(
+    supabase_admin,
+    school_id: str
+) -> Optional[Tuple[Optional[List[int]], Set[tuple]]]:
+    """
+    Get a school's password icons and its cached set of used sequences.
+    
+    When the used sequences are not cached yet, both come from the
+    get_school_icon_state database function (migrations/014) in one round trip.
+    If that function is unavailable, the school and its students are queried
+    separately.
+    
+    Returns:
+        (password_icons, used_sequences), or None if the school does not exist
+    """
+    with _used_sequences_lock:
+        used_sequences = _used_sequences_cache.get(school_id)
+    
+    if used_sequences is None:
+        try:
+            result = supabase_admin.rpc("get_school_icon_state", {
+                "p_school_id": school_id,
+                "p_exclude_student": None
+            }).execute()
+        except Exception as e:
+            logger.warning(f"get_school_icon_state failed for school {school_id}, querying separately: {str(e)}")
+        else:
+            if not result.data:
+                return None
+            row = result.data[0]
+            loaded = {
+                tuple(icon_seq) for icon_seq in row.get("used_sequences") or []
+                if isinstance(icon_seq, list) and len(icon_seq) == 5
+            }
+            with _used_sequences_lock:
+                used_sequences = _used_sequences_cache.setdefault(school_id, loaded)
+            return row.get("password_icons"), used_sequences
+    
+    school = _fetch_school_password_icons(supabase_admin, school_id)
+    if not school:
+        return None
+    
+    if used_sequences is None:
+        used_sequences = _get_cached_used_sequences(supabase_admin, school_id)
+    return school.get("password_icons"), used_sequences
+
+
+def remember_icon_sequence(school_id: str, sequence: List[int]) -> None:
+    """Mark a sequence as used in the school's cache (e.g. one entered manually by a teacher)"""
+    with _used_sequences_lock:
+        used_sequences = _used_sequences_cache.get(school_id)
+        if used_sequences is not None:
+            used_sequences.add(tuple(sequence))
 
 
 def generate_student_icon_sequence(
@@ -186,28 +326,19 @@ def generate_student_icon_sequence(
     Args:
         supabase_admin: Supabase admin client
         school_id: School ID
-        student_id: Optional student ID to exclude from collision check
+        student_id: Optional student ID being re-issued a sequence (their current
+            sequence stays reserved, so the new one always differs)
     
     Returns:
         List of 5 icon IDs, or None if generation failed
     """
     try:
-        # Get school's password icons
-        try:
-            school = supabase_admin.table("schools").select("password_icons").eq("id", school_id).single().execute()
-        except Exception as e:
-            # Check if the error is about missing column
-            error_msg = str(e).lower()
-            if "password_icons" in error_msg and ("does not exist" in error_msg or "column" in error_msg):
-                logger.error(f"password_icons column does not exist. Please run migration: migrations/002_add_school_password_icons.sql")
-                raise Exception("Database migration required: password_icons column missing. Please run migrations/002_add_school_password_icons.sql")
-            raise
-        
-        if not school.data:
+        school_state = _load_school_icon_state(supabase_admin, school_id)
+        if school_state is None:
             logger.error(f"School not found: {school_id}")
             return None
         
-        password_icons = school.data.get("password_icons")
+        password_icons, used_sequences = school_state
         
         # If school doesn't have password icons set, generate them
         if not password_icons or len(password_icons) != 9:
@@ -223,11 +354,11 @@ def generate_student_icon_sequence(
                     raise Exception("Database migration required: password_icons column missing. Please run migrations/002_add_school_password_icons.sql")
                 raise
         
-        # Get used sequences
-        used_sequences = get_used_sequences_for_school(supabase_admin, school_id, student_id=student_id)
-        
-        # Generate unique sequence
-        sequence = generate_unique_icon_sequence(password_icons, used_sequences)
+        # Pick and reserve an unused sequence in the school's cached set
+        with _used_sequences_lock:
+            sequence = generate_unique_icon_sequence(password_icons, used_sequences)
+            if sequence:
+                used_sequences.add(tuple(sequence))
         
         if sequence:
             logger.info(f"Generated icon sequence for student: {sequence}")
@@ -241,6 +372,31 @@ def generate_student_icon_sequence(
         return None
 
 
+def make_icon_sequence_validator(school_password_icons: List[int]) -> Callable[[List[int]], bool]:
+    """
+    Build a validator for one school's icon sequences.
+    
+    The school's icon set is built once, so checking many sequences against the
+    same school does not rebuild it per call.
+    
+    Args:
+        school_password_icons: List of school's 9 password icon IDs
+    
+    Returns:
+        Function returning True if a sequence is 5 distinct icons from the school's set
+    """
+    school_icons = frozenset(school_password_icons)
+    
+    def validate(sequence: List[int]) -> bool:
+        if not sequence or len(sequence) != 5:
+            return False
+        sequence_set = set(sequence)
+        # 5 distinct icons (no duplicates), all from the school's password icons
+        return len(sequence_set) == 5 and sequence_set <= school_icons
+    
+    return validate
+
+
 def validate_icon_sequence(sequence: List[int], school_password_icons: List[int]) -> bool:
     """
     Validate that an icon sequence is valid for a school.
@@ -252,12 +408,4 @@ def validate_icon_sequence(sequence: List[int], school_password_icons: List[int]
     Returns:
         True if valid, False otherwise
     """
-    if not sequence or len(sequence) != 5:
-        return False
-    
-    # Check that all icons in sequence are from school's password icons
-    password_icons_set = set(school_password_icons)
-    sequence_set = set(sequence)
-    
-    return sequence_set.issubset(password_icons_set) and len(sequence) == len(set(sequence))  # No duplicates
-
+    return make_icon_sequence_validator(school_password_icons)(sequence)
@@ -5,16 +5,19 @@ Script to generate OpenAPI YAML file from FastAPI application.
 import yaml
 from app.main import app
 
+# libyaml's C emitter when PyYAML was built with it; same output, much faster
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeDumper
+
 # Get the OpenAPI schema from FastAPI
 openapi_schema = app.openapi()
 
-# Convert to YAML
-yaml_content = yaml.dump(openapi_schema, default_flow_style=False, sort_keys=False, allow_unicode=True)
-
-# Write to file
+# Write the YAML straight to the file instead of building it as one string first
 output_file = "openapi.yaml"
 with open(output_file, "w", encoding="utf-8") as f:
-    f.write(yaml_content)
+    yaml.dump(openapi_schema, f, Dumper=SafeDumper, default_flow_style=False, sort_keys=False, allow_unicode=True)
 
 print(f"✅ OpenAPI YAML file generated: {output_file}")
 print(f"📄 Total endpoints: {len(openapi_schema.get('paths', {}))}")
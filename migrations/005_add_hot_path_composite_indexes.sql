@@ -0,0 +1,24 @@
+-- Migration: Composite indexes for hot role/invitation/score lookups
+-- Covers the predicates used by the school admin removal/resend endpoints and
+-- the student progress/leaderboard endpoints.
+--
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block. In the
+-- Supabase SQL Editor run each statement on its own (or via psql).
+
+-- Active role lookups filter on (user_id, role, school_id) with is_active = true
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_roles_user_role_school_active
+    ON user_roles(user_id, role, school_id)
+    WHERE is_active = true;
+
+-- Pending school admin invitations are looked up per school
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_school_admin_invitations_school_pending
+    ON school_admin_invitations(school_id, invitation_status)
+    WHERE invitation_status = 'pending';
+
+-- Score aggregation per student can be answered from the index alone
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_game_sessions_student_score
+    ON game_sessions(student_id) INCLUDE (score);
+
+-- Survey responses are read per student and matched against questions
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_survey_responses_student_question
+    ON survey_responses(student_id, question_id);
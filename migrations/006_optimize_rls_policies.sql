@@ -0,0 +1,54 @@
+-- Migration: Evaluate auth.role() once per statement in RLS policies
+-- Calling auth.role() directly in a policy re-evaluates it for every row.
+-- Wrapping it in a sub-select lets Postgres run it once as an InitPlan and
+-- reuse the result for the whole scan. Policy semantics are unchanged.
+--
+-- Safe to re-run.
+
+ALTER POLICY "Service role can do everything" ON users
+    USING ((SELECT auth.role()) = 'service_role');
+
+ALTER POLICY "Service role can do everything" ON user_roles
+    USING ((SELECT auth.role()) = 'service_role');
+
+ALTER POLICY "Service role can do everything" ON schools
+    USING ((SELECT auth.role()) = 'service_role');
+
+ALTER POLICY "Service role can do everything" ON school_locations
+    USING ((SELECT auth.role()) = 'service_role');
+
+ALTER POLICY "Service role can do everything" ON teachers
+    USING ((SELECT auth.role()) = 'service_role');
+
+ALTER POLICY "Service role can do everything" ON teacher_schools
+    USING ((SELECT auth.role()) = 'service_role');
+
+ALTER POLICY "Service role can do everything" ON classes
+    USING ((SELECT auth.role()) = 'service_role');
+
+ALTER POLICY "Service role can do everything" ON students
+    USING ((SELECT auth.role()) = 'service_role');
+
+ALTER POLICY "Service role can do everything" ON vocabulary
+    USING ((SELECT auth.role()) = 'service_role');
+
+ALTER POLICY "Service role can do everything" ON grammar
+    USING ((SELECT auth.role()) = 'service_role');
+
+ALTER POLICY "Service role can do everything" ON survey_questions
+    USING ((SELECT auth.role()) = 'service_role');
+
+ALTER POLICY "Service role can do everything" ON survey_responses
+    USING ((SELECT auth.role()) = 'service_role');
+
+ALTER POLICY "Service role can do everything" ON game_sessions
+    USING ((SELECT auth.role()) = 'service_role');
+
+ALTER POLICY "Service role can do everything" ON payments
+    USING ((SELECT auth.role()) = 'service_role');
+
+ALTER POLICY "Service role can do everything" ON themes
+    USING ((SELECT auth.role()) = 'service_role');
+
+ALTER POLICY "Service role can do everything" ON feature_flags
+    USING ((SELECT auth.role()) = 'service_role');
@@ -0,0 +1,58 @@
+-- Migration: Remove a school admin or pending invitation in one round trip
+-- Used by DELETE /api/schools/{school_id}/admins/{admin_id}.
+--
+-- p_admin_id is either a user ID (active school_admin role) or the ID of a
+-- pending school_admin_invitations row. Returns:
+--   'role'        - the admin's school_admin role was deactivated
+--   'invitation'  - the pending invitation was deleted
+--   'self'        - the caller tried to remove their own admin role (nothing changed)
+--   'not_found'   - neither an active admin nor a pending invitation matched
+
+CREATE OR REPLACE FUNCTION remove_school_admin_or_invitation(
+    p_school_id UUID,
+    p_admin_id UUID,
+    p_caller_id UUID
+)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF p_admin_id = p_caller_id THEN
+        IF EXISTS (
+            SELECT 1 FROM user_roles
+            WHERE user_id = p_admin_id
+              AND role = 'school_admin'
+              AND school_id = p_school_id
+              AND is_active = true
+        ) THEN
+            RETURN 'self';
+        END IF;
+    ELSE
+        UPDATE user_roles
+        SET is_active = false, updated_at = NOW()
+        WHERE user_id = p_admin_id
+          AND role = 'school_admin'
+          AND school_id = p_school_id
+          AND is_active = true;
+
+        IF FOUND THEN
+            RETURN 'role';
+        END IF;
+    END IF;
+
+    DELETE FROM school_admin_invitations
+    WHERE id = p_admin_id
+      AND school_id = p_school_id
+      AND invitation_status = 'pending';
+
+    IF FOUND THEN
+        RETURN 'invitation';
+    END IF;
+
+    RETURN 'not_found';
+END;
+$$;
+
+-- Only the backend (service role) may call this function
+REVOKE EXECUTE ON FUNCTION remove_school_admin_or_invitation(UUID, UUID, UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION remove_school_admin_or_invitation(UUID, UUID, UUID) TO service_role;
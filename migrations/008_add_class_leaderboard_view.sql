@@ -0,0 +1,52 @@
+-- Migration: Precomputed class leaderboard
+-- GET /api/students/{student_id}/leaderboard reads a student's position from
+-- this materialized view instead of re-ranking the whole class on every load.
+-- Students added since the last refresh fall back to a live calculation in the API.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS class_leaderboard_mv AS
+SELECT
+    s.class_id,
+    s.id AS student_id,
+    s.name,
+    COALESCE(SUM(g.score), 0) AS points,
+    -- Ties are broken by student id so every student has a distinct position,
+    -- matching the live fallback in the API
+    ROW_NUMBER() OVER (PARTITION BY s.class_id ORDER BY COALESCE(SUM(g.score), 0) DESC, s.id) AS position,
+    COUNT(*) OVER (PARTITION BY s.class_id) AS total
+FROM students s
+LEFT JOIN game_sessions g ON g.student_id = s.id
+GROUP BY s.class_id, s.id, s.name;
+
+-- Unique index is required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_class_leaderboard_mv_student_id ON class_leaderboard_mv(student_id);
+CREATE INDEX IF NOT EXISTS idx_class_leaderboard_mv_class_id ON class_leaderboard_mv(class_id);
+
+-- Materialized views do not enforce RLS and this one lists every student's name
+-- and points, so only the backend (service role) may read it
+REVOKE ALL ON class_leaderboard_mv FROM PUBLIC, anon, authenticated;
+GRANT SELECT ON class_leaderboard_mv TO service_role;
+
+COMMENT ON MATERIALIZED VIEW class_leaderboard_mv IS 'Per-class ranking by total game points. Refreshed periodically by pg_cron.';
+
+-- Refresh without blocking readers
+CREATE OR REPLACE FUNCTION refresh_class_leaderboard()
+RETURNS void
+LANGUAGE sql
+AS $$
+    REFRESH MATERIALIZED VIEW CONCURRENTLY class_leaderboard_mv;
+$$;
+
+REVOKE EXECUTE ON FUNCTION refresh_class_leaderboard() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION refresh_class_leaderboard() TO service_role;
+
+-- Schedule a refresh every 5 minutes when pg_cron is enabled
+-- (Database > Extensions > pg_cron in the Supabase dashboard).
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule('refresh-class-leaderboard', '*/5 * * * *', 'SELECT refresh_class_leaderboard()');
+    ELSE
+        RAISE NOTICE 'pg_cron is not enabled; schedule SELECT refresh_class_leaderboard() manually';
+    END IF;
+END;
+$$;
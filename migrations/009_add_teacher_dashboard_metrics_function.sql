@@ -0,0 +1,38 @@
+-- Migration: Teacher dashboard aggregates computed in the database
+-- Used by GET /api/teachers/{teacher_id}/dashboard so the API does not need to
+-- download every survey response and game session just to count/average them.
+--
+-- survey_completion_rate = survey responses per student * 100 (0 when no students)
+-- average_game_score     = mean game session score (0 when no sessions)
+
+CREATE OR REPLACE FUNCTION teacher_dashboard_metrics(p_teacher_id UUID)
+RETURNS TABLE (
+    total_classes INTEGER,
+    total_students INTEGER,
+    survey_completion_rate NUMERIC,
+    average_game_score NUMERIC
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH teacher_classes AS (
+        SELECT id FROM classes WHERE teacher_id = p_teacher_id
+    ),
+    teacher_students AS (
+        SELECT s.id FROM students s JOIN teacher_classes c ON s.class_id = c.id
+    )
+    SELECT
+        (SELECT COUNT(*) FROM teacher_classes)::INTEGER,
+        (SELECT COUNT(*) FROM teacher_students)::INTEGER,
+        COALESCE(
+            (SELECT COUNT(*) FROM survey_responses sr JOIN teacher_students ts ON sr.student_id = ts.id)::NUMERIC
+                / NULLIF((SELECT COUNT(*) FROM teacher_students), 0) * 100,
+            0
+        ),
+        COALESCE(
+            (SELECT AVG(COALESCE(gs.score, 0)) FROM game_sessions gs JOIN teacher_students ts ON gs.student_id = ts.id),
+            0
+        );
+$$;
+
+GRANT EXECUTE ON FUNCTION teacher_dashboard_metrics(UUID) TO anon, authenticated, service_role;
@@ -0,0 +1,18 @@
+-- Migration: Composite indexes for teacher content lookups
+-- The teacher vocabulary, grammar and survey question endpoints filter on
+-- teacher_id and optionally class_id. A composite index serves both forms.
+-- (students.class_id, classes.teacher_id, teacher_schools.teacher_id,
+-- survey_responses.student_id and game_sessions.student_id are already indexed
+-- in schema.sql.)
+--
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block. In the
+-- Supabase SQL Editor run each statement on its own (or via psql).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_vocabulary_teacher_class
+    ON vocabulary(teacher_id, class_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_grammar_teacher_class
+    ON grammar(teacher_id, class_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_survey_questions_teacher_class
+    ON survey_questions(teacher_id, class_id);
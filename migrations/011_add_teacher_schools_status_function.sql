@@ -0,0 +1,39 @@
+-- Migration: Teacher school memberships with invitation status resolved in the database
+-- Used by GET /api/teachers/{teacher_id}/schools so the API gets each school name
+-- and the effective invitation status in one round trip, without parsing
+-- invitation_expires_at per row.
+--
+-- invitation_status is the stored status, except that a pending invitation past
+-- invitation_expires_at is reported as 'expired'.
+
+CREATE OR REPLACE FUNCTION teacher_schools_status(p_teacher_id UUID)
+RETURNS TABLE (
+    school_id UUID,
+    school_name VARCHAR,
+    invitation_status VARCHAR,
+    invitation_token VARCHAR,
+    invitation_expires_at TIMESTAMP WITH TIME ZONE,
+    invitation_sent_at TIMESTAMP WITH TIME ZONE
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        ts.school_id,
+        s.name,
+        CASE
+            WHEN COALESCE(ts.invitation_status, 'pending') = 'pending'
+                 AND ts.invitation_expires_at < NOW() THEN 'expired'
+            ELSE COALESCE(ts.invitation_status, 'pending')
+        END::VARCHAR,
+        ts.invitation_token,
+        ts.invitation_expires_at,
+        ts.invitation_sent_at
+    FROM teacher_schools ts
+    JOIN schools s ON s.id = ts.school_id
+    WHERE ts.teacher_id = p_teacher_id;
+$$;
+
+-- Only the backend (service role) may call this function; it returns invitation tokens
+REVOKE EXECUTE ON FUNCTION teacher_schools_status(UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION teacher_schools_status(UUID) TO service_role;
@@ -0,0 +1,17 @@
+-- Migration: Index-only lookups for "which classes and students belong to teacher X"
+-- The teacher students list, the teacher dashboard (rows and
+-- teacher_dashboard_metrics) and the leaderboard all resolve a teacher's class
+-- ids and then the student ids in those classes. With these indexes both steps
+-- are answered from the index alone, without reading classes or students rows.
+-- This gives the benefit of a precomputed teacher -> student map without the
+-- write cost and staleness of a materialized view that would have to be
+-- refreshed on every student insert/delete.
+--
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block. In the
+-- Supabase SQL Editor run each statement on its own (or via psql).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_classes_teacher_id_id
+    ON classes(teacher_id, id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_students_class_id_id
+    ON students(class_id, id);
@@ -0,0 +1,11 @@
+-- Migration: Covering index for class ownership lookups
+-- add_student (and the other teacher endpoints that resolve a class) read
+-- teacher_id and school_id for a single class id. INCLUDE-ing both columns in an
+-- index on id lets Postgres answer that lookup with an index-only scan instead
+-- of visiting the classes heap.
+--
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block. In the
+-- Supabase SQL Editor run it on its own (or via psql).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_classes_id_teacher_school
+    ON classes(id) INCLUDE (teacher_id, school_id);
@@ -0,0 +1,37 @@
+-- Migration: School password icons and used student icon sequences in one call
+-- Used when generating a student's icon sequence so the API gets the school's
+-- password icons and every sequence already taken in the school in one round
+-- trip, instead of one query for the school and another for its students.
+--
+-- Returns no row if the school does not exist. used_sequences only contains
+-- complete (5-icon) sequences; p_exclude_student leaves one student's
+-- sequence out, e.g. when re-issuing it.
+
+CREATE OR REPLACE FUNCTION get_school_icon_state(p_school_id UUID, p_exclude_student UUID DEFAULT NULL)
+RETURNS TABLE (
+    password_icons INTEGER[],
+    used_sequences INTEGER[][]
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        s.password_icons,
+        COALESCE(
+            (
+                SELECT array_agg(st.icon_sequence)
+                FROM students st
+                JOIN classes c ON c.id = st.class_id
+                WHERE c.school_id = s.id
+                  AND array_length(st.icon_sequence, 1) = 5
+                  AND (p_exclude_student IS NULL OR st.id <> p_exclude_student)
+            ),
+            '{}'
+        )
+    FROM schools s
+    WHERE s.id = p_school_id;
+$$;
+
+-- Only the backend (service role) may call this function; students' icon sequences are their passwords
+REVOKE EXECUTE ON FUNCTION get_school_icon_state(UUID, UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION get_school_icon_state(UUID, UUID) TO service_role;
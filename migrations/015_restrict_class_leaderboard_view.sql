@@ -0,0 +1,34 @@
+-- Migration: Restrict class_leaderboard_mv to the service role and break ties by student id
+-- For databases that already ran the original migrations/008:
+-- - the view was readable with the public anon key. Materialized views do not
+--   enforce RLS, so that exposed every student's name and points across all schools.
+-- - positions used RANK(), so tied students shared a position while the API's live
+--   fallback numbered them one by one. ROW_NUMBER() ordered by points, then
+--   student id, gives both paths the same positions.
+-- The view is recreated because a materialized view's query cannot be altered.
+
+DROP MATERIALIZED VIEW IF EXISTS class_leaderboard_mv;
+
+CREATE MATERIALIZED VIEW class_leaderboard_mv AS
+SELECT
+    s.class_id,
+    s.id AS student_id,
+    s.name,
+    COALESCE(SUM(g.score), 0) AS points,
+    ROW_NUMBER() OVER (PARTITION BY s.class_id ORDER BY COALESCE(SUM(g.score), 0) DESC, s.id) AS position,
+    COUNT(*) OVER (PARTITION BY s.class_id) AS total
+FROM students s
+LEFT JOIN game_sessions g ON g.student_id = s.id
+GROUP BY s.class_id, s.id, s.name;
+
+-- Unique index is required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_class_leaderboard_mv_student_id ON class_leaderboard_mv(student_id);
+CREATE INDEX IF NOT EXISTS idx_class_leaderboard_mv_class_id ON class_leaderboard_mv(class_id);
+
+REVOKE ALL ON class_leaderboard_mv FROM PUBLIC, anon, authenticated;
+GRANT SELECT ON class_leaderboard_mv TO service_role;
+
+COMMENT ON MATERIALIZED VIEW class_leaderboard_mv IS 'Per-class ranking by total game points. Refreshed periodically by pg_cron.';
+
+REVOKE EXECUTE ON FUNCTION refresh_class_leaderboard() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION refresh_class_leaderboard() TO service_role;
@@ -71,6 +71,7 @@ CREATE INDEX IF NOT EXISTS idx_user_roles_role ON user_roles(role);
 CREATE INDEX IF NOT EXISTS idx_user_roles_school_id ON user_roles(school_id);
 CREATE INDEX IF NOT EXISTS idx_user_roles_active ON user_roles(user_id, is_active) WHERE is_active = true;
 CREATE INDEX IF NOT EXISTS idx_user_roles_user_role ON user_roles(user_id, role, is_active);
+CREATE INDEX IF NOT EXISTS idx_user_roles_user_role_school_active ON user_roles(user_id, role, school_id) WHERE is_active = true;
 
 COMMENT ON TABLE user_roles IS 'Junction table supporting multiple roles per user. Enables users to have platform_admin, school_admin, and teacher roles simultaneously.';
 COMMENT ON COLUMN user_roles.role IS 'Role type: platform_admin, school_admin, teacher, or student';
@@ -102,6 +103,7 @@ CREATE INDEX IF NOT EXISTS idx_school_admin_invitations_school_id ON school_admi
 CREATE INDEX IF NOT EXISTS idx_school_admin_invitations_email ON school_admin_invitations(email);
 CREATE INDEX IF NOT EXISTS idx_school_admin_invitations_token ON school_admin_invitations(invitation_token);
 CREATE INDEX IF NOT EXISTS idx_school_admin_invitations_status ON school_admin_invitations(invitation_status);
+CREATE INDEX IF NOT EXISTS idx_school_admin_invitations_school_pending ON school_admin_invitations(school_id, invitation_status) WHERE invitation_status = 'pending';
 
 COMMENT ON TABLE school_admin_invitations IS 'Stores invitation tokens for school admin users';
 COMMENT ON COLUMN school_admin_invitations.invitation_token IS 'Unique token for school admin invitation email';
@@ -195,6 +197,8 @@ CREATE TABLE IF NOT EXISTS classes (
 CREATE INDEX IF NOT EXISTS idx_classes_school_id ON classes(school_id);
 CREATE INDEX IF NOT EXISTS idx_classes_teacher_id ON classes(teacher_id);
 CREATE INDEX IF NOT EXISTS idx_classes_location_id ON classes(location_id);
+CREATE INDEX IF NOT EXISTS idx_classes_teacher_id_id ON classes(teacher_id, id);
+CREATE INDEX IF NOT EXISTS idx_classes_id_teacher_school ON classes(id) INCLUDE (teacher_id, school_id);
 
 -- ============================================================================
 -- STUDENTS
@@ -212,6 +216,7 @@ CREATE TABLE IF NOT EXISTS students (
 );
 
 CREATE INDEX IF NOT EXISTS idx_students_class_id ON students(class_id);
+CREATE INDEX IF NOT EXISTS idx_students_class_id_id ON students(class_id, id);
 
 -- ============================================================================
 -- VOCABULARY
@@ -233,6 +238,7 @@ CREATE TABLE IF NOT EXISTS vocabulary (
 
 CREATE INDEX IF NOT EXISTS idx_vocabulary_teacher_id ON vocabulary(teacher_id);
 CREATE INDEX IF NOT EXISTS idx_vocabulary_class_id ON vocabulary(class_id);
+CREATE INDEX IF NOT EXISTS idx_vocabulary_teacher_class ON vocabulary(teacher_id, class_id);
 CREATE INDEX IF NOT EXISTS idx_vocabulary_student_id ON vocabulary(student_id);
 
 -- ============================================================================
@@ -254,6 +260,7 @@ CREATE TABLE IF NOT EXISTS grammar (
 
 CREATE INDEX IF NOT EXISTS idx_grammar_teacher_id ON grammar(teacher_id);
 CREATE INDEX IF NOT EXISTS idx_grammar_class_id ON grammar(class_id);
+CREATE INDEX IF NOT EXISTS idx_grammar_teacher_class ON grammar(teacher_id, class_id);
 CREATE INDEX IF NOT EXISTS idx_grammar_student_id ON grammar(student_id);
 
 -- ============================================================================
@@ -273,6 +280,7 @@ CREATE TABLE IF NOT EXISTS survey_questions (
 
 CREATE INDEX IF NOT EXISTS idx_survey_questions_teacher_id ON survey_questions(teacher_id);
 CREATE INDEX IF NOT EXISTS idx_survey_questions_class_id ON survey_questions(class_id);
+CREATE INDEX IF NOT EXISTS idx_survey_questions_teacher_class ON survey_questions(teacher_id, class_id);
 
 -- ============================================================================
 -- SURVEY RESPONSES
@@ -289,6 +297,7 @@ CREATE TABLE IF NOT EXISTS survey_responses (
 CREATE INDEX IF NOT EXISTS idx_survey_responses_student_id ON survey_responses(student_id);
 CREATE INDEX IF NOT EXISTS idx_survey_responses_question_id ON survey_responses(question_id);
 CREATE INDEX IF NOT EXISTS idx_survey_responses_lesson_id ON survey_responses(lesson_id);
+CREATE INDEX IF NOT EXISTS idx_survey_responses_student_question ON survey_responses(student_id, question_id);
 
 -- ============================================================================
 -- GAME SESSIONS
@@ -306,6 +315,7 @@ CREATE TABLE IF NOT EXISTS game_sessions (
 
 CREATE INDEX IF NOT EXISTS idx_game_sessions_student_id ON game_sessions(student_id);
 CREATE INDEX IF NOT EXISTS idx_game_sessions_game_type ON game_sessions(game_type);
+CREATE INDEX IF NOT EXISTS idx_game_sessions_student_score ON game_sessions(student_id) INCLUDE (score);
 
 -- ============================================================================
 -- PAYMENTS
@@ -475,53 +485,55 @@ DROP POLICY IF EXISTS "Allow public read access" ON themes;
 DROP POLICY IF EXISTS "Allow public read access" ON feature_flags;
 
 -- Allow service role to do everything (for backend API)
+-- auth.role() is wrapped in a sub-select so it is evaluated once per statement
+-- (InitPlan) instead of once per row
 CREATE POLICY "Service role can do everything" ON users
-    FOR ALL USING (auth.role() = 'service_role');
+    FOR ALL USING ((SELECT auth.role()) = 'service_role');
 
 CREATE POLICY "Service role can do everything" ON user_roles
-    FOR ALL USING (auth.role() = 'service_role');
+    FOR ALL USING ((SELECT auth.role()) = 'service_role');
 
 CREATE POLICY "Service role can do everything" ON schools
-    FOR ALL USING (auth.role() = 'service_role');
+    FOR ALL USING ((SELECT auth.role()) = 'service_role');
 
 CREATE POLICY "Service role can do everything" ON school_locations
-    FOR ALL USING (auth.role() = 'service_role');
+    FOR ALL USING ((SELECT auth.role()) = 'service_role');
 
 CREATE POLICY "Service role can do everything" ON teachers
-    FOR ALL USING (auth.role() = 'service_role');
+    FOR ALL USING ((SELECT auth.role()) = 'service_role');
 
 CREATE POLICY "Service role can do everything" ON teacher_schools
-    FOR ALL USING (auth.role() = 'service_role');
+    FOR ALL USING ((SELECT auth.role()) = 'service_role');
 
 CREATE POLICY "Service role can do everything" ON classes
-    FOR ALL USING (auth.role() = 'service_role');
+    FOR ALL USING ((SELECT auth.role()) = 'service_role');
 
 CREATE POLICY "Service role can do everything" ON students
-    FOR ALL USING (auth.role() = 'service_role');
+    FOR ALL USING ((SELECT auth.role()) = 'service_role');
 
 CREATE POLICY "Service role can do everything" ON vocabulary
-    FOR ALL USING (auth.role() = 'service_role');
+    FOR ALL USING ((SELECT auth.role()) = 'service_role');
 
 CREATE POLICY "Service role can do everything" ON grammar
-    FOR ALL USING (auth.role() = 'service_role');
+    FOR ALL USING ((SELECT auth.role()) = 'service_role');
 
 CREATE POLICY "Service role can do everything" ON survey_questions
-    FOR ALL USING (auth.role() = 'service_role');
+    FOR ALL USING ((SELECT auth.role()) = 'service_role');
 
 CREATE POLICY "Service role can do everything" ON survey_responses
-    FOR ALL USING (auth.role() = 'service_role');
+    FOR ALL USING ((SELECT auth.role()) = 'service_role');
 
 CREATE POLICY "Service role can do everything" ON game_sessions
-    FOR ALL USING (auth.role() = 'service_role');
+    FOR ALL USING ((SELECT auth.role()) = 'service_role');
 
 CREATE POLICY "Service role can do everything" ON payments
-    FOR ALL USING (auth.role() = 'service_role');
+    FOR ALL USING ((SELECT auth.role()) = 'service_role');
 
 CREATE POLICY "Service role can do everything" ON themes
-    FOR ALL USING (auth.role() = 'service_role');
+    FOR ALL USING ((SELECT auth.role()) = 'service_role');
 
 CREATE POLICY "Service role can do everything" ON feature_flags
-    FOR ALL USING (auth.role() = 'service_role');
+    FOR ALL USING ((SELECT auth.role()) = 'service_role');
 
 -- For development/testing, you might want to allow public access
 -- Remove these in production and use proper authentication-based policies
@@ -4,7 +4,7 @@ Diagnostic script to check pytest setup and available fixtures.
 Run this to diagnose why mocker fixture might not be available.
 """
 import sys
-import subprocess
+from importlib.metadata import entry_points
 
 def check_environment():
     """Check the Python environment and pytest setup."""
@@ -32,25 +32,17 @@ def check_environment():
         print("4. pytest: NOT INSTALLED")
         return False
     
-    # Try to get available fixtures
+    # pytest-mock provides the mocker fixture through its pytest11 plugin entry
+    # point; checking the registration avoids running a second pytest process
     print("\n5. Checking available fixtures...")
-    try:
-        result = subprocess.run(
-            [sys.executable, "-m", "pytest", "--fixtures", "tests/check_pytest_setup.py"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if "mocker" in result.stdout:
-            print("   ✓ mocker fixture is available")
-        else:
-            print("   ✗ mocker fixture NOT found in available fixtures")
-            print("\n   Available fixtures:")
-            for line in result.stdout.split('\n'):
-                if 'fixture' in line.lower() or '--' in line:
-                    print(f"     {line[:80]}")
-    except Exception as e:
-        print(f"   Could not check fixtures: {e}")
+    plugins = {ep.name: ep.value for ep in entry_points(group="pytest11")}
+    if any(value.split(":")[0] == "pytest_mock" for value in plugins.values()):
+        print("   ✓ mocker fixture is available")
+    else:
+        print("   ✗ mocker fixture NOT found in available fixtures")
+        print("\n   Registered pytest plugins:")
+        for name, value in sorted(plugins.items()):
+            print(f"     {name} = {value}"[:80])
     
     print("\n" + "=" * 60)
     print("RECOMMENDATION:")
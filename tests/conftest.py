@@ -6,6 +6,7 @@ preventing import errors when running tests without all production dependencies
 """
 import sys
 import types
+from types import SimpleNamespace
 from unittest.mock import MagicMock
 
 # Mock pydantic_settings module before any imports that depend on it
@@ -35,7 +36,7 @@ mock_supabase_module = MagicMock()
 mock_client_instance = MagicMock()
 
 # Create a mock create_client function
-def mock_create_client(url, key):
+def mock_create_client(url, key, options=None):
     return mock_client_instance
 
 mock_supabase_module.create_client = mock_create_client
@@ -47,19 +48,22 @@ sys.modules['supabase'] = mock_supabase_module
 
 # Mock app.config.settings to avoid needing real environment variables
 # We need to do this before app.config is imported
-# Create mock_settings first
-mock_settings = MagicMock()
-mock_settings.supabase_project_url = "https://mock.supabase.co"
-mock_settings.supabase_anon_key = "mock_anon_key"
-mock_settings.supabase_service_role_key = "mock_service_key"
-mock_settings.supabase_jwt_secret = None
-mock_settings.database_url = None
-mock_settings.environment = "test"
-mock_settings.resend_api_key = None
-mock_settings.resend_from_email = None
-mock_settings.frontend_admins_url = None
-mock_settings.frontend_schools_url = None
-mock_settings.frontend_teachers_url = None
+# A plain namespace with the Settings fields: cheaper than a MagicMock, and an
+# unknown attribute raises instead of silently returning a truthy mock
+mock_settings = SimpleNamespace(
+    supabase_project_url="https://mock.supabase.co",
+    supabase_anon_key="mock_anon_key",
+    supabase_service_role_key="mock_service_key",
+    supabase_jwt_secret=None,
+    database_url=None,
+    environment="test",
+    resend_api_key=None,
+    resend_from_email=None,
+    frontend_admins_url=None,
+    frontend_schools_url=None,
+    frontend_teachers_url=None,
+    assemblyai_api_key=None,
+)
 
 # Create a mock Settings class that returns our mock_settings when instantiated
 class MockSettings(MockBaseSettings):
@@ -90,6 +94,61 @@ mock_supabase_admin_client = MagicMock()
 import pytest
 from fastapi.testclient import TestClient
 
+
+class FakeQuery:
+    """
+    Lightweight stand-in for a supabase-py query builder.
+    
+    Builder methods record their arguments in calls and return the query itself.
+    eq() and in_() filter the rows like PostgREST would, so a test fails if the
+    code under test filters on the wrong column or values. Much cheaper than a
+    MagicMock chain.
+    """
+    __slots__ = ("_data", "_single", "calls")
+    
+    def __init__(self, data):
+        self._data = data
+        self._single = False
+        self.calls = []
+    
+    def select(self, *args):
+        self.calls.append(("select", *args))
+        return self
+    
+    def eq(self, column, value):
+        self.calls.append(("eq", column, value))
+        self._data = [row for row in self._data if row.get(column) == value]
+        return self
+    
+    def in_(self, column, values):
+        self.calls.append(("in_", column, values))
+        wanted = set(values)
+        self._data = [row for row in self._data if row.get(column) in wanted]
+        return self
+    
+    def single(self):
+        self.calls.append(("single",))
+        self._single = True
+        return self
+    
+    def execute(self):
+        if self._single:
+            # Like PostgREST, one row is returned as an object rather than a list
+            return SimpleNamespace(data=self._data[0] if self._data else None)
+        return SimpleNamespace(data=self._data)
+
+
+class FakeSupabase:
+    """Stand-in for a Supabase client whose table(name) returns the FakeQuery registered for that table."""
+    __slots__ = ("tables",)
+    
+    def __init__(self, tables):
+        self.tables = tables
+    
+    def table(self, table_name):
+        return self.tables[table_name]
+
+
 # Explicitly check for pytest-mock plugin
 # The 'mocker' fixture is required by tests, so we need to ensure it's available
 try:
@@ -160,10 +219,22 @@ def app():
     from app.main import app
     return app
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def client(app):
-    """Fixture to provide a test client."""
-    return TestClient(app)
+    """Fixture to provide a test client, shared by the whole session (the app lifespan runs once)."""
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture(autouse=True)
+def reset_shared_state(app):
+    """Reset the shared mock clients and in-process caches between tests."""
+    from app.routers import teachers, theming
+    
+    yield
+    for mock in (mock_client_instance, mock_supabase_admin_client):
+        mock.reset_mock(return_value=True, side_effect=True)
+    teachers._invalidate_read_cache()
+    theming._theme_cache.clear()
 
 # Optional fixtures that require pytest-mock
 # These are not used by the current tests but are available for future use
@@ -181,3 +252,49 @@ if pytest_mock_available:
         """Fixture to mock supabase (anon client) for tests. Requires pytest-mock."""
         mock = mocker.patch('app.database.supabase')
         return mock
+
+    @pytest.fixture
+    def mock_schools_supabase(mocker):
+        """
+        Patch the schools router's supabase_admin with a FakeSupabase for the school teachers endpoint.
+        
+        Returns set_data(teacher_schools_data), which sets the teacher_schools rows
+        (each with its embedded "teachers" record) and gives back the fake table.
+        """
+        from app.routers import schools
+        
+        fake = FakeSupabase({})
+        mocker.patch.object(schools, 'supabase_admin', fake)
+        
+        def set_data(teacher_schools_data):
+            fake.tables["teacher_schools"] = FakeQuery(teacher_schools_data)
+            return fake.tables["teacher_schools"]
+        
+        return set_data
+
+    @pytest.fixture
+    def school_admin_user(app, mocker):
+        """
+        Authenticate requests as an active school admin of school-1.
+        
+        get_current_user is overridden and require_role reads the admin's role from a
+        FakeSupabase; the schools router's own access check is patched to allow access.
+        Returns the user object the endpoints receive.
+        """
+        from app import auth
+        from app.routers import schools
+        
+        user = SimpleNamespace(user=SimpleNamespace(id="admin-1"))
+        app.dependency_overrides[auth.get_current_user] = lambda: user
+        mocker.patch.object(auth, 'supabase', FakeSupabase({
+            "user_roles": FakeQuery([{
+                "user_id": "admin-1",
+                "role": "school_admin",
+                "school_id": "school-1",
+                "expires_at": None,
+                "is_active": True,
+            }]),
+        }))
+        mocker.patch.object(schools, 'check_school_access', return_value=True)
+        yield user
+        app.dependency_overrides.pop(auth.get_current_user, None)
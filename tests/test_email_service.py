@@ -0,0 +1,149 @@
+"""
+Tests for Resend send retries and bulk teacher invitations
+"""
+from types import SimpleNamespace
+
+import pytest
+from resend.exceptions import ResendError
+
+from app.services import email as email_module
+from app.services.email import EmailService, MAX_BATCH_EMAILS, SEND_MAX_ATTEMPTS, _send_with_retries
+
+
+def _resend_error(code, error_type):
+    return ResendError(code=code, error_type=error_type, message=error_type, suggested_action="")
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record retry delays instead of sleeping"""
+    delays = []
+    monkeypatch.setattr(email_module, "time", SimpleNamespace(sleep=delays.append))
+    return delays
+
+
+class FakeSend:
+    """Resend send function that raises the queued errors in order, then returns result"""
+
+    def __init__(self, *errors, result=None):
+        self.errors = list(errors)
+        self.result = result if result is not None else {"id": "email-1"}
+        self.calls = []
+
+    def __call__(self, params, options=None):
+        self.calls.append((params, options))
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.result
+
+
+def test_rate_limit_is_retried_with_one_idempotency_key(sleeps):
+    """Test that a rate-limited send is retried and every attempt reuses the idempotency key"""
+    send = FakeSend(_resend_error(429, "rate_limit_exceeded"), _resend_error(429, "rate_limit_exceeded"))
+
+    assert _send_with_retries(send, {"to": ["a@example.com"]}) == {"id": "email-1"}
+
+    assert len(send.calls) == 3
+    keys = {options["idempotency_key"] for _, options in send.calls}
+    assert len(keys) == 1 and None not in keys
+    # Exponential backoff plus up to SEND_RETRY_BASE_DELAY of jitter
+    base = email_module.SEND_RETRY_BASE_DELAY
+    assert len(sleeps) == 2
+    for attempt, delay in enumerate(sleeps):
+        assert base * 2 ** attempt <= delay <= base * 2 ** attempt + base
+
+
+@pytest.mark.parametrize("error", [
+    pytest.param(_resend_error(429, "daily_quota_exceeded"), id="quota_exceeded"),
+    pytest.param(_resend_error(422, "validation_error"), id="validation_error"),
+])
+def test_permanent_errors_are_not_retried(sleeps, error):
+    """Test that quota 429s and validation errors fail on the first attempt"""
+    send = FakeSend(error)
+
+    with pytest.raises(ResendError):
+        _send_with_retries(send, {"to": ["a@example.com"]})
+
+    assert len(send.calls) == 1
+    assert sleeps == []
+
+
+def test_retries_stop_after_max_attempts(sleeps):
+    """Test that a send failing every time is attempted SEND_MAX_ATTEMPTS times"""
+    send = FakeSend(*[_resend_error(503, "service_unavailable")] * SEND_MAX_ATTEMPTS)
+
+    with pytest.raises(ResendError):
+        _send_with_retries(send, {"to": ["a@example.com"]})
+
+    assert len(send.calls) == SEND_MAX_ATTEMPTS
+    assert len(sleeps) == SEND_MAX_ATTEMPTS - 1
+
+
+@pytest.fixture
+def configured_service():
+    """An EmailService that sends through fake Resend Emails/Batch APIs"""
+    service = EmailService()
+    service._teacher_invitation_url_prefix = "https://teachers.example.com/teacher/accept-invitation?token="
+    service.resend = SimpleNamespace(Batch=SimpleNamespace(send=None))
+    service._emails_api = SimpleNamespace(send=FakeSend())
+    return service
+
+
+def _invitations(count):
+    return [
+        {
+            "teacher_email": f"teacher{i}@example.com",
+            "teacher_name": f"Teacher {i}",
+            "school_name": "Test School",
+            "invitation_token": f"token-{i}",
+            "inviter_name": "admin@example.com",
+        }
+        for i in range(count)
+    ]
+
+
+def test_bulk_maps_rejections_back_to_invitations(configured_service, sleeps):
+    """Test chunking by MAX_BATCH_EMAILS and mapping permissive-mode errors to the original order"""
+    batches = []
+
+    def batch_send(params, options):
+        batches.append((params, options))
+        if len(batches) == 2:
+            # Positions are relative to the chunk: chunk 2 starts at invitation 100
+            return {"data": [], "errors": [{"index": 0, "message": "Invalid `to` field"}, {"index": 2, "message": "Blocked"}]}
+        return {"data": [], "errors": []}
+
+    configured_service.resend.Batch.send = batch_send
+
+    results = configured_service.send_teacher_invitations_bulk(_invitations(2 * MAX_BATCH_EMAILS + 3))
+
+    assert [len(params) for params, _ in batches] == [MAX_BATCH_EMAILS, MAX_BATCH_EMAILS, 3]
+    assert all(options["batch_validation"] == "permissive" for _, options in batches)
+    assert batches[1][0][0]["to"] == ["teacher100@example.com"]
+    failed = {i: (email, error) for i, (email, sent, error) in enumerate(results) if not sent}
+    assert failed == {
+        100: ("teacher100@example.com", "Invalid `to` field"),
+        102: ("teacher102@example.com", "Blocked"),
+    }
+    assert len(results) == 2 * MAX_BATCH_EMAILS + 3
+
+
+def test_bulk_failed_chunk_only_fails_its_invitations(configured_service, sleeps):
+    """Test that a chunk failing with a quota error marks only its own invitations as not sent"""
+    batches = []
+
+    def batch_send(params, options):
+        batches.append(params)
+        if len(batches) == 1:
+            raise _resend_error(429, "daily_quota_exceeded")
+        return {"data": [], "errors": []}
+
+    configured_service.resend.Batch.send = batch_send
+
+    # MAX_BATCH_EMAILS + 1 invitations: one full batch, then a single email sent through Emails.send
+    results = configured_service.send_teacher_invitations_bulk(_invitations(MAX_BATCH_EMAILS + 1))
+
+    assert len(batches) == 1
+    assert all(not sent and error.startswith("Email send failed") for _, sent, error in results[:MAX_BATCH_EMAILS])
+    assert results[MAX_BATCH_EMAILS] == (f"teacher{MAX_BATCH_EMAILS}@example.com", True, None)
+    assert len(configured_service._emails_api.send.calls) == 1
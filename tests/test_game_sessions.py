@@ -0,0 +1,62 @@
+"""
+Tests for the batched game session writer
+"""
+import asyncio
+
+import pytest
+
+from app.routers import students
+
+
+def _session(student_id, score=10):
+    return {
+        "student_id": student_id,
+        "game_type": "word_match_rush",
+        "score": score,
+        "content_ids": [],
+        "difficulty_level": 1,
+    }
+
+
+@pytest.fixture
+def inserted_rows(monkeypatch):
+    """Replace the database insert; rows for "deleted-student" fail like a foreign key violation"""
+    inserted = []
+
+    def fake_insert(rows):
+        if any(row["student_id"] == "deleted-student" for row in rows):
+            raise Exception("insert or update on table \"game_sessions\" violates foreign key constraint")
+        inserted.extend(rows)
+
+    monkeypatch.setattr(students, "_insert_game_sessions", fake_insert)
+    return inserted
+
+
+def test_failing_row_only_drops_itself(inserted_rows, caplog):
+    """Test that one bad row in a batch does not lose the other students' sessions"""
+    batch = [_session("student-1"), _session("deleted-student"), _session("student-2")]
+
+    asyncio.run(students._flush_game_sessions(batch))
+
+    assert [row["student_id"] for row in inserted_rows] == ["student-1", "student-2"]
+    dropped = [r for r in caplog.records if r.message.startswith("Dropped queued game session")]
+    assert len(dropped) == 1
+    assert "deleted-student" in dropped[0].message
+
+
+def test_stop_flushes_queued_sessions(inserted_rows, monkeypatch):
+    """Test that stopping the writer inserts every session still in the queue"""
+    # The writer globals are module state shared with the app lifespan; restore them afterwards
+    monkeypatch.setattr(students, "_game_session_queue", None)
+    monkeypatch.setattr(students, "_game_session_writer", None)
+
+    async def run():
+        students.start_game_session_writer()
+        for i in range(students.GAME_SESSION_BATCH_SIZE + 5):
+            await students._game_session_queue.put(_session(f"student-{i}", score=i))
+        await students.stop_game_session_writer()
+
+    asyncio.run(run())
+
+    assert [row["score"] for row in inserted_rows] == list(range(students.GAME_SESSION_BATCH_SIZE + 5))
+    assert students._game_session_queue is None
@@ -1,163 +1,211 @@
 """
 Tests for school teacher management endpoints
 """
+from types import MappingProxyType
+
 import pytest
-# Note: client fixture is provided by conftest.py
+
+from tests.conftest import FakeQuery, FakeSupabase
+
+# Note: client and mock_schools_supabase fixtures are provided by conftest.py
+
+
+# Read-only teacher_schools rows (with their embedded teacher) shared by the test cases
+_ACCEPTED_TS = MappingProxyType({
+    "id": "ts-1",
+    "teacher_id": "teacher-1",
+    "school_id": "school-1",
+    "invitation_status": "accepted",
+    "invitation_token": None,
+    "invitation_sent_at": "2024-01-01T00:00:00Z",
+    "invitation_expires_at": None,
+    "teachers": MappingProxyType({"id": "teacher-1", "name": "John Doe", "email": "john@example.com"})
+})
+
+_PENDING_TS = MappingProxyType({
+    "id": "ts-2",
+    "teacher_id": "teacher-2",
+    "school_id": "school-1",
+    "invitation_status": "pending",
+    "invitation_token": "token-123",
+    "invitation_sent_at": "2024-01-01T00:00:00Z",
+    "invitation_expires_at": "2024-01-08T00:00:00Z",
+    "teachers": MappingProxyType({"id": "teacher-2", "name": "Jane Smith", "email": "jane@example.com"})
+})
+
+# teacher_schools has a relationship but teacher record doesn't exist
+_MISSING_TEACHER_TS = MappingProxyType({
+    "id": "ts-3",
+    "teacher_id": "missing-teacher",
+    "school_id": "school-1",
+    "invitation_status": "pending",
+    "teachers": None
+})
+
+_OTHER_SCHOOL_TS = MappingProxyType({
+    "id": "ts-4",
+    "teacher_id": "teacher-4",
+    "school_id": "school-2",
+    "invitation_status": "accepted",
+    "teachers": MappingProxyType({"id": "teacher-4", "name": "Other School", "email": "other@example.com"})
+})
 
 
-def test_get_school_teachers_empty(client, mocker):
+def test_get_school_teachers_empty(client, mock_schools_supabase):
     """Test getting teachers for a school with no teachers"""
-    mock_supabase = mocker.patch('app.routers.schools.supabase_admin')
-    mock_table = mocker.MagicMock()
-    mock_supabase.table.return_value = mock_table
-    
     # Mock empty teacher_schools response
-    mock_table.select.return_value.eq.return_value.execute.return_value.data = []
-    
+    mock_table = mock_schools_supabase(())
+
     response = client.get("/api/schools/test-school-id/teachers")
-    
+
     assert response.status_code == 200
-    assert response.json() == {"teachers": []}
-    mock_table.select.assert_called_once_with("*")
-    mock_table.select.return_value.eq.assert_called_once_with("school_id", "test-school-id")
+    # The body is fixed, so compare the raw bytes instead of parsing them
+    assert response.content == b'{"teachers":[]}'
+    # Teachers are embedded in the teacher_schools query, so there is no second lookup
+    assert mock_table.calls == [("select", "*, teachers(*)"), ("eq", "school_id", "test-school-id")]
+
+
+def pytest_generate_tests(metafunc):
+    """Run each test that takes a case once per entry in its class's cases table"""
+    if "case" in metafunc.fixturenames:
+        cases = metafunc.cls.cases
+        metafunc.parametrize("case", cases, ids=[case["name"] for case in cases])
 
 
-def test_get_school_teachers_with_accepted_teacher(client, mocker):
-    """Test getting teachers including one with accepted invitation status"""
-    mock_supabase = mocker.patch('app.routers.schools.supabase_admin')
-    mock_table = mocker.MagicMock()
-    mock_supabase.table.return_value = mock_table
+class TestSchoolsTeachers:
+    """Teacher records are merged with their teacher_schools invitation data"""
     
-    # Mock teacher_schools response
-    teacher_schools_data = [
+    cases = [
         {
-            "id": "ts-1",
-            "teacher_id": "teacher-1",
-            "school_id": "school-1",
-            "invitation_status": "accepted",
-            "invitation_token": None,
-            "invitation_sent_at": "2024-01-01T00:00:00Z",
-            "invitation_expires_at": None
-        }
-    ]
-    
-    # Mock teachers response
-    teachers_data = [
+            "name": "accepted_teacher",
+            "teacher_schools": (_ACCEPTED_TS,),
+            "expected": (
+                {
+                    "id": "teacher-1",
+                    "name": "John Doe",
+                    "email": "john@example.com",
+                    "invitation_status": "accepted",
+                    "teacher_school_id": "ts-1"
+                },
+            ),
+        },
         {
-            "id": "teacher-1",
-            "name": "John Doe",
-            "email": "john@example.com"
-        }
+            "name": "pending_teacher",
+            "teacher_schools": (_PENDING_TS,),
+            "expected": ({"invitation_status": "pending", "invitation_token": "token-123"},),
+        },
+        # Should skip the missing teacher and return empty list
+        {"name": "skips_missing_teacher", "teacher_schools": (_MISSING_TEACHER_TS,), "expected": ()},
+        # Only relationships for the requested school are returned
+        {"name": "other_school_filtered", "teacher_schools": (_OTHER_SCHOOL_TS,), "expected": ()},
     ]
     
-    # Setup mocks for two table calls
-    mock_table1 = mocker.MagicMock()
-    mock_table2 = mocker.MagicMock()
-    
-    def table_side_effect(table_name):
-        if table_name == "teacher_schools":
-            mock_table1.select.return_value.eq.return_value.execute.return_value.data = teacher_schools_data
-            return mock_table1
-        elif table_name == "teachers":
-            mock_table2.select.return_value.in_.return_value.execute.return_value.data = teachers_data
-            return mock_table2
-    
-    mock_supabase.table.side_effect = table_side_effect
-    
-    response = client.get("/api/schools/school-1/teachers")
-    
+    def test_get_school_teachers(self, client, mock_schools_supabase, case):
+        """Test the school teachers listing for one case from the table"""
+        mock_schools_supabase(case["teacher_schools"])
+        
+        response = client.get("/api/schools/school-1/teachers")
+        
+        assert response.status_code == 200
+        teachers = response.json()["teachers"]
+        assert len(teachers) == len(case["expected"])
+        for teacher, expected_fields in zip(teachers, case["expected"]):
+            # Only the listed fields are checked
+            assert {key: teacher[key] for key in expected_fields} == expected_fields
+
+
+@pytest.fixture
+def bulk_invite_mocks(mocker):
+    """
+    Patch the bulk invite endpoint's database and email helpers.
+    
+    _create_teacher_invitation fails with a 400 for "member@example.com" and with a
+    database error for "broken@example.com"; every email sent is reported as delivered.
+    Returns (create_invitation, send_bulk) mocks.
+    """
+    from fastapi import HTTPException
+    from app.routers import schools
+    from app.services.email import email_service
+
+    def create_invitation(school_id, name, email):
+        if email == "member@example.com":
+            raise HTTPException(status_code=400, detail="Teacher is already associated with this school")
+        if email == "broken@example.com":
+            raise Exception('duplicate key value violates unique constraint "teachers_email_key"')
+        return f"teacher-{name}", f"token-{name}"
+
+    create_invitation_mock = mocker.patch.object(schools, '_create_teacher_invitation', side_effect=create_invitation)
+    mocker.patch.object(schools, '_get_invitation_sender', return_value=("Test School", "admin@example.com"))
+    send_bulk = mocker.patch.object(
+        email_service,
+        'send_teacher_invitations_bulk',
+        side_effect=lambda invitations: [(i["teacher_email"], True, None) for i in invitations],
+    )
+    return create_invitation_mock, send_bulk
+
+
+def test_add_teachers_bulk_duplicate_email(client, school_admin_user, bulk_invite_mocks):
+    """Test that an email repeated within one batch is only invited once"""
+    create_invitation, send_bulk = bulk_invite_mocks
+
+    response = client.post("/api/schools/school-1/teachers/bulk", json=[
+        {"name": "a", "email": "new@example.com"},
+        {"name": "b", "email": "New@Example.com "},
+    ])
+
     assert response.status_code == 200
-    data = response.json()
-    assert len(data["teachers"]) == 1
-    teacher = data["teachers"][0]
-    assert teacher["id"] == "teacher-1"
-    assert teacher["name"] == "John Doe"
-    assert teacher["email"] == "john@example.com"
-    assert teacher["invitation_status"] == "accepted"
-    assert teacher["teacher_school_id"] == "ts-1"
-
-
-def test_get_school_teachers_with_pending_teacher(client, mocker):
-    """Test getting teachers including one with pending invitation status"""
-    mock_supabase = mocker.patch('app.routers.schools.supabase_admin')
-    
-    teacher_schools_data = [
-        {
-            "id": "ts-2",
-            "teacher_id": "teacher-2",
-            "school_id": "school-1",
-            "invitation_status": "pending",
-            "invitation_token": "token-123",
-            "invitation_sent_at": "2024-01-01T00:00:00Z",
-            "invitation_expires_at": "2024-01-08T00:00:00Z"
-        }
-    ]
-    
-    teachers_data = [
-        {
-            "id": "teacher-2",
-            "name": "Jane Smith",
-            "email": "jane@example.com"
-        }
-    ]
-    
-    mock_table1 = mocker.MagicMock()
-    mock_table2 = mocker.MagicMock()
-    
-    def table_side_effect(table_name):
-        if table_name == "teacher_schools":
-            mock_table1.select.return_value.eq.return_value.execute.return_value.data = teacher_schools_data
-            return mock_table1
-        elif table_name == "teachers":
-            mock_table2.select.return_value.in_.return_value.execute.return_value.data = teachers_data
-            return mock_table2
-    
-    mock_supabase.table.side_effect = table_side_effect
-    
-    response = client.get("/api/schools/school-1/teachers")
-    
+    results = response.json()["teachers"]
+    assert results[0] == {"email": "new@example.com", "teacher_id": "teacher-a", "invitation_sent": True}
+    assert results[1]["teacher_id"] is None
+    assert results[1]["error"] == "Duplicate email in this request"
+    assert create_invitation.call_count == 1
+    assert [i["teacher_email"] for i in send_bulk.call_args.args[0]] == ["new@example.com"]
+
+
+def test_add_teachers_bulk_mixed_results(client, school_admin_user, bulk_invite_mocks):
+    """Test that failed entries are reported per teacher and the rest are still invited"""
+    _, send_bulk = bulk_invite_mocks
+
+    response = client.post("/api/schools/school-1/teachers/bulk", json=[
+        {"name": "a", "email": "a@example.com"},
+        {"name": "m", "email": "member@example.com"},
+        {"name": "x", "email": "broken@example.com"},
+        {"name": "c", "email": "c@example.com"},
+    ])
+
     assert response.status_code == 200
     data = response.json()
-    assert len(data["teachers"]) == 1
-    teacher = data["teachers"][0]
-    assert teacher["invitation_status"] == "pending"
-    assert teacher["invitation_token"] == "token-123"
+    assert data["message"] == "2 teachers added"
+    assert [(r["teacher_id"], r["invitation_sent"], r.get("error")) for r in data["teachers"]] == [
+        ("teacher-a", True, None),
+        (None, False, "Teacher is already associated with this school"),
+        (None, False, "Failed to create teacher invitation"),
+        ("teacher-c", True, None),
+    ]
+    assert [i["teacher_email"] for i in send_bulk.call_args.args[0]] == ["a@example.com", "c@example.com"]
 
 
-def test_get_school_teachers_skips_missing_teacher(client, mocker):
-    """Test that teachers without a teacher record are skipped"""
-    mock_supabase = mocker.patch('app.routers.schools.supabase_admin')
-    
-    # teacher_schools has a relationship but teacher record doesn't exist
-    teacher_schools_data = [
-        {
-            "id": "ts-3",
-            "teacher_id": "missing-teacher",
-            "school_id": "school-1",
-            "invitation_status": "pending"
-        }
-    ]
-    
-    # No teachers returned (teacher record missing)
-    teachers_data = []
-    
-    mock_table1 = mocker.MagicMock()
-    mock_table2 = mocker.MagicMock()
-    
-    def table_side_effect(table_name):
-        if table_name == "teacher_schools":
-            mock_table1.select.return_value.eq.return_value.execute.return_value.data = teacher_schools_data
-            return mock_table1
-        elif table_name == "teachers":
-            mock_table2.select.return_value.in_.return_value.execute.return_value.data = teachers_data
-            return mock_table2
-    
-    mock_supabase.table.side_effect = table_side_effect
-    
-    response = client.get("/api/schools/school-1/teachers")
-    
+@pytest.mark.parametrize("email_configured,expected_queued", [
+    pytest.param(True, True, id="queued"),
+    pytest.param(False, False, id="email_not_configured"),
+])
+def test_add_teacher_reports_queued_invitation(client, school_admin_user, mocker, email_configured, expected_queued):
+    """Test that add_teacher reports the invitation as queued, not as sent"""
+    from app.routers import schools
+    from app.services import email as email_module
+
+    teacher = {"id": "teacher-1", "name": "Ann", "email": "ann@example.com"}
+    mocker.patch.object(schools, 'supabase_admin', FakeSupabase({"teachers": FakeQuery([teacher])}))
+    mocker.patch.object(schools, '_create_teacher_invitation', return_value=("teacher-1", "token-1"))
+    mocker.patch.object(schools, '_get_invitation_sender', return_value=("Test School", "admin@example.com"))
+    mocker.patch.object(email_module.email_service, 'resend', object() if email_configured else None)
+    enqueue = mocker.patch.object(email_module, 'enqueue_email')
+
+    response = client.post("/api/schools/school-1/teachers", data={"name": "Ann", "email": "ann@example.com"})
+
     assert response.status_code == 200
     data = response.json()
-    # Should skip the missing teacher and return empty list
-    assert len(data["teachers"]) == 0
-
+    assert data["teacher"] == teacher
+    assert data["invitation_queued"] is expected_queued
+    assert "invitation_sent" not in data
+    assert enqueue.called is expected_queued
@@ -0,0 +1,32 @@
+"""
+Tests for the student leaderboard position fallback
+"""
+from app.routers import students
+from tests.conftest import FakeQuery, FakeSupabase
+
+
+class FakeTables(FakeSupabase):
+    """FakeSupabase whose tables hold rows; every table() call starts a fresh query"""
+
+    def table(self, table_name):
+        return FakeQuery(self.tables[table_name])
+
+
+def test_live_position_breaks_ties_by_student_id(mocker):
+    """Test that tied students are numbered by id, like ROW_NUMBER() in class_leaderboard_mv"""
+    mocker.patch.object(students, 'supabase', FakeTables({
+        "students": [
+            {"id": "c-student", "class_id": "class-1"},
+            {"id": "a-student", "class_id": "class-1"},
+            {"id": "b-student", "class_id": "class-1"},
+        ],
+        "game_sessions": [
+            {"student_id": "c-student", "score": 30},
+            {"student_id": "a-student", "score": 10},
+            {"student_id": "b-student", "score": 10},
+        ],
+    }))
+
+    positions = {sid: students._compute_leaderboard_position(sid) for sid in ("a-student", "b-student", "c-student")}
+
+    assert positions == {"c-student": (1, 3), "a-student": (2, 3), "b-student": (3, 3)}